@@ -0,0 +1,25 @@
+-- Migration script to add crop_faqs table
+-- Stores pre-generated AgriBot answers (see generate_faq_answers.py)
+
+USE agri_v;
+
+CREATE TABLE IF NOT EXISTS crop_faqs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    crop_id INT NULL,
+    question TEXT NOT NULL,
+    question_key CHAR(64) NOT NULL,
+    answer TEXT,
+    model VARCHAR(100),
+    prompt_version VARCHAR(50),
+    source VARCHAR(20) DEFAULT 'admin',
+    generated_at DATETIME,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_crop_faqs_crop_question (crop_id, question_key),
+    INDEX idx_crop_faqs_question_key (question_key),
+    INDEX idx_crop_faqs_prompt_version (prompt_version),
+    FOREIGN KEY (crop_id) REFERENCES crops(id) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Verify the table was created
+SHOW TABLES LIKE 'crop_faqs';
+DESCRIBE crop_faqs;
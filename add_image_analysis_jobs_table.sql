@@ -0,0 +1,24 @@
+-- Migration script to add image_analysis_jobs table
+-- Backs the asynchronous image analysis API (see image_jobs.py)
+
+USE agri_v;
+
+CREATE TABLE IF NOT EXISTS image_analysis_jobs (
+    id CHAR(32) PRIMARY KEY,
+    owner VARCHAR(100) NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    status_code INT,
+    result MEDIUMTEXT,
+    error TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME,
+    finished_at DATETIME,
+    expires_at DATETIME,
+    INDEX idx_image_jobs_owner_status (owner, status),
+    INDEX idx_image_jobs_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Verify the table was created
+SHOW TABLES LIKE 'image_analysis_jobs';
+DESCRIBE image_analysis_jobs;
@@ -0,0 +1,24 @@
+-- Migration script to add scouting_observations table
+-- Per-photo diagnoses from POST /api/scouting/upload linked to a crop monitoring session
+
+USE agri_v;
+
+CREATE TABLE IF NOT EXISTS scouting_observations (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    session_id INT NOT NULL,
+    user_id INT NOT NULL,
+    week_number INT,
+    filename VARCHAR(255),
+    image_digest CHAR(64),
+    prediction VARCHAR(100),
+    confidence FLOAT,
+    tier VARCHAR(20),
+    structured_data TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_scouting_observations_session (session_id),
+    FOREIGN KEY (session_id) REFERENCES crop_monitoring_sessions(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Verify the table was created
+SHOW TABLES LIKE 'scouting_observations';
+DESCRIBE scouting_observations;
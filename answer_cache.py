@@ -0,0 +1,151 @@
+# answer_cache.py - LRU/TTL cache of AgriBot answers keyed by normalized question
+"""
+Answers are keyed by (model, decoding options, normalized question). Normalization folds
+case, Unicode forms, punctuation, whitespace and common stop-words, so "When to apply
+UREA for paddy?" and "when should I apply urea for paddy" share an entry.
+
+With ANSWER_CACHE_EMBED_MODEL set (e.g. "nomic-embed-text"), a miss on the exact key
+falls back to the most similar cached question for the same model/options whose cosine
+similarity is at least ANSWER_CACHE_SIMILARITY.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import metrics
+
+ANSWER_CACHE_ENABLED = os.environ.get('ANSWER_CACHE_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'on'}
+ANSWER_CACHE_SIZE = int(os.environ.get('ANSWER_CACHE_SIZE', '2000'))
+ANSWER_CACHE_TTL = int(os.environ.get('ANSWER_CACHE_TTL', str(7 * 24 * 3600)))
+ANSWER_CACHE_EMBED_MODEL = os.environ.get('ANSWER_CACHE_EMBED_MODEL', '')
+ANSWER_CACHE_SIMILARITY = float(os.environ.get('ANSWER_CACHE_SIMILARITY', '0.92'))
+
+# Question words (what/when/how/which...) are deliberately not folded: they change the answer
+STOP_WORDS = frozenset("""
+a an the is are was were be been being am do does did doing to of in on at by for with from
+into about as and or but if then so than that this these those it its i me my we our you your
+he she they them their can could should would will shall may might must please tell explain
+give know want need help any some there here
+""".split())
+
+_PUNCT_RE = re.compile(r"[^\w\s]+", re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Fold case, Unicode forms, punctuation, whitespace and stop-words."""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    text = _PUNCT_RE.sub(' ', text)
+    words = [w for w in _SPACE_RE.split(text) if w and w not in STOP_WORDS]
+    return ' '.join(words)
+
+
+def cacheable_question(messages):
+    """Return the question text for single-turn chats; None when history would change the answer."""
+    if not isinstance(messages, list):
+        return None
+    turns = [m for m in messages if isinstance(m, dict) and m.get('role') != 'system']
+    if len(turns) != 1 or turns[0].get('role') != 'user' or not isinstance(turns[0].get('content'), str):
+        return None
+    return turns[0]['content']
+
+
+def _scope(model: str, options: dict) -> str:
+    return f"{model}|{json.dumps(options or {}, sort_keys=True)}"
+
+
+def _cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class AnswerCache:
+    """Thread-safe LRU cache with per-entry TTL and optional embedding-similarity lookup."""
+
+    def __init__(self, max_size=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL,
+                 embed_model=ANSWER_CACHE_EMBED_MODEL, similarity=ANSWER_CACHE_SIMILARITY):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.embed_model = embed_model
+        self.similarity = similarity
+        self._entries = OrderedDict()  # key -> {"scope", "answer", "expires", "embedding"}
+        self._lock = threading.Lock()
+
+    def _key(self, scope: str, normalized: str) -> str:
+        return hashlib.sha256(f"{scope}|{normalized}".encode()).hexdigest()
+
+    def _embed(self, text: str):
+        if not self.embed_model:
+            return None
+        try:
+            import ollama_client
+            result = ollama_client.embeddings(model=self.embed_model, prompt=text)
+            vector = result.get('embedding') if isinstance(result, dict) else getattr(result, 'embedding', None)
+            return list(vector) if vector else None
+        except Exception as e:
+            logging.warning("Answer cache embedding failed: %s", e)
+            return None
+
+    def get(self, question: str, model: str, options: dict):
+        """Return a cached answer or None, recording hit/miss metrics."""
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        scope = _scope(model, options)
+        key = self._key(scope, normalized)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["expires"] > now:
+                self._entries.move_to_end(key)
+                metrics.inc("answer_cache_requests_total", result="hit", model=model)
+                return entry["answer"]
+            if entry:
+                del self._entries[key]
+
+        embedding = self._embed(normalized)
+        if embedding is not None:
+            best_key, best_score = None, self.similarity
+            with self._lock:
+                for other_key, other in self._entries.items():
+                    if other["scope"] != scope or other["expires"] <= now or not other.get("embedding"):
+                        continue
+                    score = _cosine(embedding, other["embedding"])
+                    if score >= best_score:
+                        best_key, best_score = other_key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    metrics.inc("answer_cache_requests_total", result="similar_hit", model=model)
+                    return self._entries[best_key]["answer"]
+        metrics.inc("answer_cache_requests_total", result="miss", model=model)
+        return None
+
+    def put(self, question: str, model: str, options: dict, answer: str) -> None:
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        scope = _scope(model, options)
+        entry = {"scope": scope, "answer": answer, "expires": time.time() + self.ttl,
+                 "embedding": self._embed(normalized)}
+        with self._lock:
+            self._entries[self._key(scope, normalized)] = entry
+            self._entries.move_to_end(self._key(scope, normalized))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            metrics.set_gauge("answer_cache_entries", len(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            metrics.set_gauge("answer_cache_entries", 0)
+
+
+answer_cache = AnswerCache()
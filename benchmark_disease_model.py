@@ -0,0 +1,132 @@
+"""
+Latency / throughput / agreement benchmark for the disease-model variants.
+
+Runs each variant from the manifest written by export_disease_model.py, plus the base
+model, over a held-out image folder. An ImageFolder layout (one sub-folder per class
+label) also reports accuracy; a flat folder reports agreement only. Per variant it
+prints the p50 / p95 latency per batch, throughput in images/s, and top-1 agreement
+with the base model. Pick the fastest variant whose agreement is acceptable and set
+DISEASE_MODEL_VARIANT on that machine.
+
+Usage:
+    python benchmark_disease_model.py --images data/heldout
+    python benchmark_disease_model.py --images data/heldout --variants int8 onnx --batch-size 8 --threads 2
+    python benchmark_disease_model.py --images data/heldout --output bench_disease.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import torch
+
+import disease_model
+from disease_model import DISEASE_MODEL_PATH, DISEASE_VARIANTS_MANIFEST, DISEASE_RESIZE, DiseaseClassifier
+from image_ingest import decode
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+def load_images(folder, limit):
+    """[(PIL image, label or None)] from an ImageFolder-style or flat directory."""
+    items = []
+    for root, _, files in os.walk(folder):
+        label = os.path.basename(root) if os.path.abspath(root) != os.path.abspath(folder) else None
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                with open(os.path.join(root, name), 'rb') as fh:
+                    items.append((decode(fh.read(), min_side=DISEASE_RESIZE), label))
+                if limit and len(items) >= limit:
+                    return items
+    return items
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def bench_variant(classifier, images, batch_size, warmup, repeats):
+    tensors = [classifier.preprocess(img) for img, _ in images]
+    batches = [tensors[i:i + batch_size] for i in range(0, len(tensors), batch_size)]
+    for batch in batches[:warmup]:
+        classifier.predict_tensors(batch)
+
+    latencies, predictions = [], []
+    started = time.perf_counter()
+    for repeat in range(repeats):
+        for batch in batches:
+            t0 = time.perf_counter()
+            results = classifier.predict_tensors(batch)
+            latencies.append(time.perf_counter() - t0)
+            if repeat == 0:
+                predictions.extend(r["prediction"] for r in results)
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "images_per_s": round(len(tensors) * repeats / wall, 1) if wall else 0.0,
+    }, predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark disease-model variants on held-out images")
+    parser.add_argument('--images', required=True, help="Held-out image folder (ImageFolder layout for accuracy)")
+    parser.add_argument('--manifest', default=DISEASE_VARIANTS_MANIFEST)
+    parser.add_argument('--base-model', default=DISEASE_MODEL_PATH)
+    parser.add_argument('--variants', nargs='*', help="Variants to run (default: all in the manifest)")
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--limit', type=int, default=500, help="At most this many images")
+    parser.add_argument('--warmup', type=int, default=3, help="Warm-up batches per variant")
+    parser.add_argument('--repeats', type=int, default=3, help="Passes over the image set per variant")
+    parser.add_argument('--threads', type=int, help="torch intra-op threads (default: DISEASE_NUM_THREADS)")
+    parser.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args()
+
+    if args.threads:
+        disease_model.DISEASE_NUM_THREADS = args.threads
+    images = load_images(args.images, args.limit)
+    if not images:
+        print(f"No images found in {args.images}", file=sys.stderr)
+        sys.exit(1)
+    labelled = all(label is not None for _, label in images)
+
+    names = args.variants
+    if names is None:
+        names = list(disease_model.load_manifest(args.manifest)["variants"]) if os.path.exists(args.manifest) else []
+    runs = [("base", DiseaseClassifier(path=args.base_model, variant=''))]
+    runs += [(name, DiseaseClassifier(variant=name, manifest_path=args.manifest)) for name in names]
+
+    print(f"Benchmarking {len(runs)} variants on {len(images)} images "
+          f"(batch={args.batch_size}, threads={disease_model.DISEASE_NUM_THREADS}, torch {torch.__version__})")
+    print(f"{'variant':<14} {'p50 ms':>9} {'p95 ms':>9} {'img/s':>9} {'agree':>8}" + (f" {'acc':>8}" if labelled else ""))
+    results, reference = {}, None
+    for name, classifier in runs:
+        if not classifier.ready():
+            print(f"{name:<14} unavailable: {classifier.error}")
+            results[name] = {"error": classifier.error}
+            continue
+        stats, predictions = bench_variant(classifier, images, args.batch_size, args.warmup, args.repeats)
+        if reference is None:
+            reference = predictions
+        stats["top1_agreement"] = round(sum(a == b for a, b in zip(predictions, reference)) / len(predictions), 4)
+        if labelled:
+            stats["accuracy"] = round(sum(p == label for p, (_, label) in zip(predictions, images)) / len(images), 4)
+        results[name] = stats
+        line = (f"{name:<14} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['images_per_s']:>9.1f} "
+                f"{stats['top1_agreement']:>8.2%}")
+        print(line + (f" {stats['accuracy']:>8.2%}" if labelled else ""))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump({"images": len(images), "batch_size": args.batch_size,
+                       "threads": disease_model.DISEASE_NUM_THREADS, "results": results}, fh, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+"""
+Endpoint benchmark for the read-heavy API routes.
+
+Builds a database from the mysql.sql seed data (SQLite by default), scales it with
+synthetic users / monitoring sessions / progress rows, drives each route through the
+Flask test client (or a running server with --base-url) and writes p50/p99 latency and
+throughput per route to a JSON baseline. Compare two runs with --compare.
+
+Usage:
+    python benchmark_endpoints.py --scale 200 --requests 300 --output bench_baseline.json
+    python benchmark_endpoints.py --scale 200 --requests 300 --compare bench_baseline.json
+    python benchmark_endpoints.py --base-url http://127.0.0.1:5050 --requests 500 --concurrency 8
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SEED_SQL_PATH = os.path.join(HERE, 'mysql.sql')
+
+BENCH_PASSWORD = 'bench-password'
+
+# (name, method, path template, JSON body, needs login)
+ROUTES = [
+    ("crops", "GET", "/api/crops", None, False),
+    ("crop_detail", "GET", "/api/crops/{crop_id}", None, False),
+    ("weekly_guidance", "GET", "/api/crops/{crop_id}/weekly-guidance/{week}", None, False),
+    ("crop_suggestions", "POST", "/api/crop-suggestions", {"soil_type": "Loamy Soil", "land_size": 2.5}, False),
+    ("land_calculations", "POST", "/api/land-calculations",
+     {"land_size": 2.5, "soil_type": "Loamy Soil", "irrigation_type": "drip"}, False),
+    ("active_crops", "GET", "/api/active-crops", None, True),
+    ("progress_notifications", "GET", "/api/progress/notifications/{session_id}", None, True),
+    ("weekly_summary", "GET", "/api/progress/weekly-summary/{session_id}", None, True),
+]
+
+
+# ================= Seed SQL Parsing =================
+def split_statements(sql: str):
+    """Split a MySQL script on top-level semicolons, dropping -- and /* */ comments."""
+    statements, buf, quote = [], [], None
+    i, n = 0, len(sql)
+    while i < n:
+        c = sql[i]
+        if quote:
+            buf.append(c)
+            if c == '\\' and i + 1 < n:
+                buf.append(sql[i + 1])
+                i += 2
+                continue
+            if c == quote:
+                if i + 1 < n and sql[i + 1] == quote:
+                    buf.append(sql[i + 1])
+                    i += 2
+                    continue
+                quote = None
+            i += 1
+            continue
+        if c in ("'", '"', '`'):
+            quote = c
+            buf.append(c)
+        elif sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        elif c == ';':
+            statement = ''.join(buf).strip()
+            if statement:
+                statements.append(statement)
+            buf = []
+        else:
+            buf.append(c)
+        i += 1
+    tail = ''.join(buf).strip()
+    if tail:
+        statements.append(tail)
+    return statements
+
+
+_INSERT_RE = re.compile(r'^INSERT\s+(?:IGNORE\s+)?INTO\s+`?(\w+)`?\s*\(([^)]*)\)\s*VALUES\s*(.*)$',
+                        re.IGNORECASE | re.DOTALL)
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0', '\\': '\\', "'": "'", '"': '"'}
+
+
+def _literal(token: str):
+    token = token.strip()
+    upper = token.upper()
+    if upper == 'NULL':
+        return None
+    if upper in ('TRUE', 'FALSE'):
+        return upper == 'TRUE'
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        return None  # SQL expressions such as NOW() are not evaluated
+
+
+def parse_value_tuples(values_sql: str):
+    """Parse `(a, 'b', NULL), (...)` into a list of Python value lists."""
+    rows, row, i, n = [], None, 0, len(values_sql)
+    while i < n:
+        c = values_sql[i]
+        if row is None:
+            if c == '(':
+                row = []
+            elif values_sql[i:i + 2].upper() == 'ON':
+                break  # ON DUPLICATE KEY UPDATE ...
+            i += 1
+            continue
+        if c.isspace() or c == ',':
+            i += 1
+        elif c == ')':
+            rows.append(row)
+            row = None
+            i += 1
+        elif c in ("'", '"'):
+            quote, i, chars = c, i + 1, []
+            while i < n:
+                ch = values_sql[i]
+                if ch == '\\' and i + 1 < n:
+                    chars.append(_ESCAPES.get(values_sql[i + 1], values_sql[i + 1]))
+                    i += 2
+                elif ch == quote and i + 1 < n and values_sql[i + 1] == quote:
+                    chars.append(quote)
+                    i += 2
+                elif ch == quote:
+                    i += 1
+                    break
+                else:
+                    chars.append(ch)
+                    i += 1
+            row.append(''.join(chars))
+        else:
+            depth, start = 0, i
+            while i < n and not (depth == 0 and values_sql[i] in ',)'):
+                if values_sql[i] == '(':
+                    depth += 1
+                elif values_sql[i] == ')':
+                    depth -= 1
+                i += 1
+            row.append(_literal(values_sql[start:i]))
+    return rows
+
+
+def iter_seed_inserts(sql_text: str):
+    """Yield (table, columns, rows) for each INSERT ... VALUES statement in the script."""
+    for statement in split_statements(sql_text):
+        match = _INSERT_RE.match(statement)
+        if not match:
+            continue
+        table = match.group(1)
+        columns = [c.strip().strip('`') for c in match.group(2).split(',')]
+        rows = [r for r in parse_value_tuples(match.group(3)) if len(r) == len(columns)]
+        if rows:
+            yield table, columns, rows
+
+
+# ================= Database Build =================
+def bench_models(app_module):
+    m = app_module
+    return [m.Crop, m.Fertilizer, m.Pesticide, m.CropGuide, m.CropStage, m.WeeklyTask, m.CropVideo,
+            m.ProcessVideo, m.SoilType, m.User, m.CropMonitoringSession, m.CropProgressTracking,
+            m.TaskCompletion, m.WeeklyProgress, m.CropTip, m.WeatherRecommendation, m.AuditLog]
+
+
+def load_seed_data(app_module, sql_path=SEED_SQL_PATH):
+    """Insert mysql.sql seed rows into the model tables, dropping columns the models lack."""
+    db = app_module.db
+    tables = {model.__table__.name: model.__table__ for model in bench_models(app_module)}
+    with open(sql_path, encoding='utf-8') as fh:
+        sql_text = fh.read()
+    loaded = {}
+    for table_name, columns, rows in iter_seed_inserts(sql_text):
+        table = tables.get(table_name)
+        if table is None:
+            continue
+        by_name = {c.name: c for c in table.columns}
+        required = {c.name for c in table.columns
+                    if not c.nullable and not c.primary_key and c.default is None and c.server_default is None}
+        keep = [(i, by_name[col]) for i, col in enumerate(columns) if col in by_name]
+        records = []
+        for row in rows:
+            record = {column.key: row[i] for i, column in keep}
+            present = {column.name for i, column in keep if row[i] is not None}
+            if required <= present:
+                records.append(record)
+        for record in records:
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(table.insert(), [record])
+                loaded[table_name] = loaded.get(table_name, 0) + 1
+            except Exception:
+                continue  # duplicate seed rows / constraint mismatches
+    return loaded
+
+
+def scale_dataset(app_module, scale: int, seed: int = 7):
+    """Add `scale` synthetic users, each with 1-3 monitoring sessions and progress history."""
+    m, db = app_module, app_module.db
+    rng = random.Random(seed)
+    crops = [(c.id, c.name) for c in m.Crop.query.all()]
+    tasks_by_crop = {}
+    for task in m.WeeklyTask.query.all():
+        tasks_by_crop.setdefault(task.crop_id, []).append((task.id, task.week_number, task.task_title, task.task_type))
+    if not crops:
+        return
+    users = [{"username": f"bench_user_{i}", "password": BENCH_PASSWORD, "email": f"bench_user_{i}@bench.local",
+              "role_id": 2} for i in range(scale)]
+    db.session.execute(m.User.__table__.insert(), [
+        {"username": u["username"], "password_hash": u["password"], "email": u["email"], "role_id": u["role_id"]}
+        for u in users])
+    db.session.commit()
+    user_ids = [row[0] for row in db.session.query(m.User.id).filter(m.User.username.like('bench_user_%')).all()]
+
+    sessions, now = [], datetime.now()
+    for user_id in user_ids:
+        for _ in range(rng.randint(1, 3)):
+            crop_id, crop_name = rng.choice(crops)
+            current_week = rng.randint(1, 16)
+            sessions.append({"user_id": user_id, "crop_id": crop_id, "crop_name": crop_name,
+                             "land_size": round(rng.uniform(0.2, 20), 2), "soil_type": "Loamy Soil",
+                             "start_date": now - timedelta(weeks=current_week), "current_week": current_week,
+                             "status": "active", "total_weeks": 20, "created_at": now, "updated_at": now})
+    db.session.execute(m.CropMonitoringSession.__table__.insert(), sessions)
+    db.session.commit()
+
+    progress, completions = [], []
+    for s in m.CropMonitoringSession.query.filter(m.CropMonitoringSession.user_id.in_(user_ids)).all():
+        for task_id, week, title, task_type in tasks_by_crop.get(s.crop_id, []):
+            if week > s.current_week:
+                continue
+            status = rng.choice(('completed', 'completed', 'in_progress', 'not_started'))
+            progress.append({"session_id": s.id, "week_number": week, "task_id": task_id,
+                             "completion_status": status, "created_at": now, "updated_at": now,
+                             "completion_date": now if status == 'completed' else None})
+            if status == 'completed':
+                completions.append({"session_id": s.id, "task_type": (task_type or 'other')[:20],
+                                    "task_name": title[:200], "week_number": week, "completed_at": now})
+    if progress:
+        db.session.execute(m.CropProgressTracking.__table__.insert(), progress)
+    if completions:
+        db.session.execute(m.TaskCompletion.__table__.insert(), completions)
+    db.session.commit()
+
+
+def build_database(app_module, scale: int):
+    with app_module.app.app_context():
+        db = app_module.db
+        db.metadata.create_all(db.engine, tables=[model.__table__ for model in bench_models(app_module)])
+        loaded = load_seed_data(app_module)
+        scale_dataset(app_module, scale)
+        return loaded
+
+
+# ================= Load Drivers =================
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, wall_seconds):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+    }
+
+
+def pick_fixtures(app_module):
+    """Choose ids to request: seeded crops, and the synthetic user with the most sessions."""
+    m, db = app_module, app_module.db
+    with m.app.app_context():
+        crop_ids = [row[0] for row in db.session.query(m.Crop.id).all()]
+        weeks = {}
+        for crop_id, week in db.session.query(m.WeeklyTask.crop_id, m.WeeklyTask.week_number).distinct().all():
+            weeks.setdefault(crop_id, []).append(week)
+        top = db.session.query(m.CropMonitoringSession.user_id, db.func.count(m.CropMonitoringSession.id))\
+            .group_by(m.CropMonitoringSession.user_id)\
+            .order_by(db.func.count(m.CropMonitoringSession.id).desc()).first()
+        user_id = top[0] if top else None
+        user = db.session.get(m.User, user_id) if user_id else None
+        session_ids = [row[0] for row in db.session.query(m.CropMonitoringSession.id)
+                       .filter(m.CropMonitoringSession.user_id == user_id).all()] if user_id else []
+    return {"crop_ids": crop_ids or [1], "weeks": weeks, "user_id": user_id,
+            "username": user.username if user else None, "session_ids": session_ids or [1]}
+
+
+def _expand(path, fixtures, rng):
+    crop_id = rng.choice(fixtures["crop_ids"])
+    week = rng.choice(fixtures["weeks"].get(crop_id) or [1])
+    return path.format(crop_id=crop_id, week=week, session_id=rng.choice(fixtures["session_ids"]))
+
+
+def run_in_process(app_module, fixtures, requests_per_route, concurrency, cold_cache):
+    flask_app = app_module.app
+    flask_app.config['TESTING'] = True
+    app_module.limiter.enabled = False
+    results = {}
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = flask_app.test_client()
+            if fixtures["user_id"]:
+                with local.client.session_transaction() as sess:
+                    sess['user_id'] = fixtures["user_id"]
+                    sess['username'] = fixtures["username"]
+        return local.client
+
+    for name, method, path, body, needs_login in ROUTES:
+        if needs_login and not fixtures["user_id"]:
+            continue
+        latencies, errors, lock = [], [0], threading.Lock()
+
+        def one(i, method=method, path=path, body=body):
+            rng = random.Random(i)
+            url = _expand(path, fixtures, rng)
+            if cold_cache:
+                with flask_app.app_context():
+                    app_module.cache.clear()
+            start = time.perf_counter()
+            response = client().open(url, method=method, json=body)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors[0] += 1
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(requests_per_route)))
+        results[name] = summarize(latencies, errors[0], time.perf_counter() - wall_start)
+        print(f"  {name:<24} p50={results[name]['p50_ms']:>9.2f}ms  p99={results[name]['p99_ms']:>9.2f}ms  "
+              f"{results[name]['throughput_rps']:>8.1f} req/s  errors={errors[0]}")
+    return results
+
+
+def run_against_server(base_url, fixtures, requests_per_route, concurrency):
+    import requests as http
+    results = {}
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'session'):
+            local.session = http.Session()
+            if fixtures.get("username"):
+                local.session.post(f"{base_url}/api/login",
+                                   json={"username": fixtures["username"], "password": BENCH_PASSWORD}, timeout=30)
+        return local.session
+
+    for name, method, path, body, needs_login in ROUTES:
+        if needs_login and not fixtures.get("username"):
+            continue
+        latencies, errors, lock = [], [0], threading.Lock()
+
+        def one(i, method=method, path=path, body=body):
+            rng = random.Random(i)
+            url = base_url + _expand(path, fixtures, rng)
+            start = time.perf_counter()
+            try:
+                response = client().request(method, url, json=body, timeout=60)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if failed:
+                    errors[0] += 1
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(requests_per_route)))
+        results[name] = summarize(latencies, errors[0], time.perf_counter() - wall_start)
+        print(f"  {name:<24} p50={results[name]['p50_ms']:>9.2f}ms  p99={results[name]['p99_ms']:>9.2f}ms  "
+              f"{results[name]['throughput_rps']:>8.1f} req/s  errors={errors[0]}")
+    return results
+
+
+# ================= Baseline Comparison =================
+def compare(baseline, current, tolerance):
+    """Print per-route deltas; return the routes whose p50/p99 regressed beyond tolerance."""
+    regressions = []
+    print(f"\n{'route':<24} {'p50 base':>10} {'p50 now':>10} {'p99 base':>10} {'p99 now':>10}")
+    for name, now in current["routes"].items():
+        base = baseline.get("routes", {}).get(name)
+        if not base:
+            print(f"{name:<24} {'-':>10} {now['p50_ms']:>10.2f} {'-':>10} {now['p99_ms']:>10.2f}")
+            continue
+        flag = ""
+        for key in ("p50_ms", "p99_ms"):
+            if base[key] > 0 and now[key] > base[key] * (1 + tolerance):
+                flag = "  REGRESSION"
+        if flag:
+            regressions.append(name)
+        print(f"{name:<24} {base['p50_ms']:>10.2f} {now['p50_ms']:>10.2f} "
+              f"{base['p99_ms']:>10.2f} {now['p99_ms']:>10.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark read-heavy API routes")
+    parser.add_argument('--database-uri', help="Database to build and use (default: temporary SQLite file)")
+    parser.add_argument('--skip-build', action='store_true', help="Use the database as-is (already seeded)")
+    parser.add_argument('--scale', type=int, default=100, help="Synthetic users to add (default 100)")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per route (default 200)")
+    parser.add_argument('--concurrency', type=int, default=1, help="Concurrent clients (default 1)")
+    parser.add_argument('--cold-cache', action='store_true', help="Clear the response cache before every request")
+    parser.add_argument('--base-url', help="Drive a running server (e.g. local gunicorn) instead of the test client")
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--compare', help="Baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.20, help="Allowed slowdown before flagging (default 0.20)")
+    args = parser.parse_args()
+
+    database_uri = args.database_uri or os.environ.get('BENCH_DATABASE_URI')
+    if not database_uri:
+        database_uri = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='agri-bench-'), 'bench.db')
+    os.environ['DATABASE_URI'] = database_uri
+    os.environ.setdefault('FLASK_DEBUG', 'false')
+    sys.path.insert(0, HERE)
+    import app as app_module
+
+    if not args.skip_build:
+        print(f"Building database at {database_uri} (scale={args.scale})...")
+        loaded = build_database(app_module, args.scale)
+        print("  seed rows: " + ", ".join(f"{t}={n}" for t, n in sorted(loaded.items())))
+
+    fixtures = pick_fixtures(app_module)
+    print(f"Benchmarking {len(ROUTES)} routes x {args.requests} requests (concurrency={args.concurrency})...")
+    if args.base_url:
+        routes = run_against_server(args.base_url.rstrip('/'), fixtures, args.requests, args.concurrency)
+    else:
+        routes = run_in_process(app_module, fixtures, args.requests, args.concurrency, args.cold_cache)
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "database": database_uri.split('@')[-1],
+            "driver": args.base_url or "flask-test-client",
+            "scale": args.scale,
+            "requests_per_route": args.requests,
+            "concurrency": args.concurrency,
+            "cold_cache": args.cold_cache,
+        },
+        "routes": routes,
+    }
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(result, fh, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        regressions = compare(baseline, result, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} route(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
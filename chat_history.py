@@ -0,0 +1,125 @@
+# chat_history.py - Token-budgeted AgriBot history with a rolling summary of older turns
+"""
+compact_history() keeps the leading system prompt and as many of the most recent turns as
+fit in CHAT_HISTORY_TOKEN_BUDGET (estimated tokens). Older turns are replaced by a cached
+summary, inserted as a second system message.
+
+Summaries are keyed by a hash chain over the turns they cover, so a conversation finds the
+summary of its longest already-summarized prefix. Extending it to cover the newly dropped
+turns happens on a background worker (previous summary + new turns -> new summary); the
+request that triggered it is not delayed and uses the best summary available now, so
+per-turn latency stays flat as conversations grow.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import os
+import threading
+
+import metrics
+
+CHAT_HISTORY_TOKEN_BUDGET = int(os.environ.get('CHAT_HISTORY_TOKEN_BUDGET', '2048'))
+CHAT_SUMMARY_MAX_TOKENS = int(os.environ.get('CHAT_SUMMARY_MAX_TOKENS', '200'))
+CHAT_SUMMARY_MODEL = os.environ.get('CHAT_SUMMARY_MODEL', os.environ.get('OLLAMA_MODEL', 'phi3'))
+CHAT_SUMMARY_CACHE_SIZE = int(os.environ.get('CHAT_SUMMARY_CACHE_SIZE', '1000'))
+
+SUMMARY_PROMPT = (
+    "Summarize the earlier part of this conversation between a farmer and AgriBot in at most "
+    "120 words. Keep crop names, locations, soil, quantities, dates and any advice already "
+    "given. Write plain sentences, no preamble.\n\n"
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+_summaries = OrderedDict()  # prefix hash -> summary text
+_pending = set()
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-summary")
+
+
+def estimate_tokens(message) -> int:
+    """Rough token count (~4 characters per token plus per-message overhead)."""
+    content = message.get('content') if isinstance(message, dict) else message
+    return len(str(content or '')) // 4 + 4
+
+
+def _hash_chain(turns) -> list:
+    hashes, current = [], b''
+    for m in turns:
+        current = hashlib.sha256(current + f"{m.get('role')}\x00{m.get('content')}".encode()).digest()
+        hashes.append(current.hex())
+    return hashes
+
+
+def _remember(key: str, summary: str) -> None:
+    with _lock:
+        _summaries[key] = summary
+        _summaries.move_to_end(key)
+        while len(_summaries) > CHAT_SUMMARY_CACHE_SIZE:
+            _summaries.popitem(last=False)
+
+
+def _summarize(previous: str, turns, key: str) -> None:
+    # Imported here so this module stays importable without the LLM stack
+    from llm_queue import dispatcher, coalesce_key
+    import ollama_client
+
+    transcript = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in turns)
+    prompt = SUMMARY_PROMPT
+    if previous:
+        prompt += f"Summary so far: {previous}\n\n"
+    prompt += f"New turns:\n{transcript}\n\nUpdated summary:"
+    try:
+        result = dispatcher.run(
+            lambda: ollama_client.generate(model=CHAT_SUMMARY_MODEL, prompt=prompt,
+                                           options={"temperature": 0, "num_predict": CHAT_SUMMARY_MAX_TOKENS}),
+            key=coalesce_key("summary", key), model=CHAT_SUMMARY_MODEL)
+        text = result.get('response') if isinstance(result, dict) else getattr(result, 'response', '')
+        if text and text.strip():
+            _remember(key, text.strip())
+    except Exception as e:
+        logging.warning("History summary failed: %s", e)
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def compact_history(messages, budget: int = None) -> list:
+    """Fit messages into the token budget, replacing older turns with a rolling summary."""
+    budget = budget or CHAT_HISTORY_TOKEN_BUDGET
+    if not all(isinstance(m, dict) for m in messages) or sum(estimate_tokens(m) for m in messages) <= budget:
+        return messages
+
+    head = messages[:1] if messages and messages[0].get('role') == 'system' else []
+    turns = messages[len(head):]
+    available = budget - sum(estimate_tokens(m) for m in head) - CHAT_SUMMARY_MAX_TOKENS
+    keep_from, used = len(turns), 0
+    while keep_from > 0:
+        cost = estimate_tokens(turns[keep_from - 1])
+        # The latest message is always kept, even if it alone exceeds the budget
+        if used + cost > available and keep_from < len(turns):
+            break
+        used += cost
+        keep_from -= 1
+    dropped, recent = turns[:keep_from], turns[keep_from:]
+    if not dropped:
+        return messages
+
+    hashes = _hash_chain(dropped)
+    covered, summary = 0, None
+    with _lock:
+        for i in range(len(hashes), 0, -1):
+            if hashes[i - 1] in _summaries:
+                covered, summary = i, _summaries[hashes[i - 1]]
+                _summaries.move_to_end(hashes[i - 1])
+                break
+        schedule = covered < len(dropped) and hashes[-1] not in _pending
+        if schedule:
+            _pending.add(hashes[-1])
+    if schedule:
+        _executor.submit(_summarize, summary, dropped[covered:], hashes[-1])
+
+    state = "full" if covered == len(dropped) else ("partial" if summary else "none")
+    metrics.inc("chat_history_compactions_total", summary=state)
+    summary_messages = [{"role": "system", "content": SUMMARY_PREFIX + summary}] if summary else []
+    return head + summary_messages + recent
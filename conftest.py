@@ -0,0 +1,17 @@
+# conftest.py - shared pytest configuration
+import os
+import tempfile
+
+# app.py reads DATABASE_URI at import: point it at a throwaway SQLite file (or TEST_DATABASE_URI),
+# never at the development database
+os.environ['DATABASE_URI'] = os.environ.get('TEST_DATABASE_URI') or (
+    'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='agri-test-'), 'test.db'))
+os.environ.setdefault('FLASK_DEBUG', 'false')
+# No Ollama warm-up or backend health threads when test clients send requests
+os.environ.setdefault('OLLAMA_WARMUP_ENABLED', 'false')
+os.environ.setdefault('LLM_HEALTH_INTERVAL', '0')
+
+pytest_plugins = ["query_budget"]
+
+# Manual smoke scripts that call live services at import time; run them directly with python
+collect_ignore = ["test_endpoint.py", "test_gemini_api.py", "test_gemini_fixed.py"]
@@ -0,0 +1,230 @@
+# crop_retrieval.py - Local BM25 index over crop guidance content for grounded AgriBot prompts
+"""
+Passages come from CropGuide sections, WeeklyTask instructions, CropTip and
+WeatherRecommendation rows, each prefixed with its crop name. The index is built lazily
+on first use and kept current incrementally: committed ORM inserts, updates and deletes of
+those models (e.g. from the admin content pages) re-index only the affected rows.
+
+build_context() returns the top RETRIEVAL_TOP_K passages for a question as a short
+reference block that is added to the AgriBot prompt, so a small model can answer
+crop-specific questions from the database instead of from its weights.
+"""
+from collections import Counter, defaultdict
+import logging
+import math
+import os
+import re
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import metrics
+
+RETRIEVAL_ENABLED = os.environ.get('RETRIEVAL_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'on'}
+RETRIEVAL_TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', '3'))
+RETRIEVAL_MIN_SCORE = float(os.environ.get('RETRIEVAL_MIN_SCORE', '2.0'))
+RETRIEVAL_PASSAGE_CHARS = int(os.environ.get('RETRIEVAL_PASSAGE_CHARS', '500'))
+
+GUIDE_SECTIONS = (
+    'overview', 'climate', 'soil', 'land_preparation', 'sowing', 'irrigation', 'nutrient_management',
+    'weed_management', 'pests_diseases', 'harvesting', 'yield_info',
+)
+TASK_FIELDS = ('task_description', 'step_by_step_instructions', 'tips_and_notes', 'weather_conditions',
+               'safety_precautions', 'materials_needed')
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOP = frozenset("a an the is are was were be to of in on at by for with from and or it this that as i my "
+                  "me we you your do does can should how what when which why please".split())
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for word in _TOKEN_RE.findall((text or '').lower()):
+        if len(word) < 2 or word in _STOP:
+            continue
+        # Light plural folding so "tomatoes"/"tomato" and "pests"/"pest" match
+        if len(word) > 4 and word.endswith('es') and word[-3] in 'osxz':
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class BM25Index:
+    """Incrementally updatable Okapi BM25 index; documents are grouped by owner row."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = {}  # doc_id -> {"tf": Counter, "len": int, "title": str, "text": str}
+        self.postings = defaultdict(dict)  # term -> {doc_id: tf}
+        self.owners = defaultdict(set)  # owner key -> doc_ids
+        self.total_len = 0
+        self.lock = threading.RLock()
+
+    def _remove_doc(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_len -= doc["len"]
+        for term in doc["tf"]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def replace_owner(self, owner, passages) -> None:
+        """Swap all passages of one source row for new (doc_id, title, text) tuples."""
+        with self.lock:
+            for doc_id in self.owners.pop(owner, set()):
+                self._remove_doc(doc_id)
+            for doc_id, title, text in passages:
+                tf = Counter(tokenize(f"{title} {text}"))
+                if not tf:
+                    continue
+                length = sum(tf.values())
+                self.docs[doc_id] = {"tf": tf, "len": length, "title": title, "text": text}
+                self.total_len += length
+                for term, count in tf.items():
+                    self.postings[term][doc_id] = count
+                self.owners[owner].add(doc_id)
+
+    def search(self, query: str, k: int) -> list:
+        terms = set(tokenize(query))
+        with self.lock:
+            n = len(self.docs)
+            if not n or not terms:
+                return []
+            avgdl = self.total_len / n
+            scores = defaultdict(float)
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    dl = self.docs[doc_id]["len"]
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * dl / avgdl))
+            ranked = sorted(scores.items(), key=lambda kv: -kv[1])[:k]
+            return [(score, self.docs[doc_id]["title"], self.docs[doc_id]["text"]) for doc_id, score in ranked]
+
+
+def _clean(value) -> str:
+    return re.sub(r"\s+", " ", str(value or '')).strip()
+
+
+def passages_for(row, crop_name: str) -> list:
+    """(doc_id, title, text) passages for one CropGuide / WeeklyTask / CropTip / WeatherRecommendation row."""
+    table = row.__tablename__
+    crop = crop_name or f"Crop {row.crop_id}"
+    if table == 'crop_guides':
+        return [(f"guide:{row.id}:{section}", f"{crop} - {section.replace('_', ' ')}", _clean(getattr(row, section)))
+                for section in GUIDE_SECTIONS if _clean(getattr(row, section))]
+    if table == 'weekly_tasks':
+        body = " ".join(_clean(getattr(row, f)) for f in TASK_FIELDS if _clean(getattr(row, f)))
+        return [(f"task:{row.id}", f"{crop} - week {row.week_number}: {_clean(row.task_title)}", body)]
+    if table == 'crop_tips':
+        week = f" (week {row.week_number})" if row.week_number else ""
+        return [(f"tip:{row.id}", f"{crop} tip{week}: {_clean(row.tip_title)}", _clean(row.tip_description))]
+    if table == 'weather_recommendations':
+        week = f" (week {row.week_number})" if row.week_number else ""
+        return [(f"weather:{row.id}", f"{crop} when {row.weather_condition}{week}", _clean(row.recommendation))]
+    return []
+
+
+class CropRetriever:
+    def __init__(self):
+        self.index = BM25Index()
+        self.crop_names = {}
+        self.crop_model = None
+        self.sources = ()
+        self.built = False
+        self._build_lock = threading.Lock()
+
+    def _owner(self, row) -> str:
+        return f"{row.__tablename__}:{row.id}"
+
+    def rebuild(self) -> None:
+        """Full rebuild from the database (needs an app context)."""
+        index = BM25Index()
+        self.crop_names = {c.id: c.name for c in self.crop_model.query.all()}
+        for model in self.sources:
+            for row in model.query.all():
+                index.replace_owner(self._owner(row), passages_for(row, self.crop_names.get(row.crop_id)))
+        self.index = index
+        self.built = True
+        metrics.set_gauge("retrieval_passages", len(index.docs), aggregate="max")
+        logging.info("Retrieval index built: %d passages", len(index.docs))
+
+    def ensure_built(self) -> None:
+        if self.built:
+            return
+        with self._build_lock:
+            if not self.built:
+                self.rebuild()
+
+    def search(self, question: str, k: int = None):
+        self.ensure_built()
+        hits = self.index.search(question, k or RETRIEVAL_TOP_K)
+        return [h for h in hits if h[0] >= RETRIEVAL_MIN_SCORE]
+
+    def build_context(self, question: str) -> str:
+        """Reference block for the prompt, or "" when nothing relevant is indexed."""
+        if not RETRIEVAL_ENABLED or not question or self.crop_model is None:
+            return ""
+        try:
+            with metrics.timed("retrieval_duration_seconds"):
+                hits = self.search(question)
+        except Exception as e:
+            logging.warning("Retrieval failed: %s", e)
+            return ""
+        metrics.inc("retrieval_requests_total", result="hit" if hits else "empty")
+        if not hits:
+            return ""
+        lines = ["Reference notes from the crop guidance database (use them when relevant, do not mention them):"]
+        for i, (_, title, text) in enumerate(hits, 1):
+            if len(text) > RETRIEVAL_PASSAGE_CHARS:
+                text = text[:RETRIEVAL_PASSAGE_CHARS].rsplit(' ', 1)[0] + " ..."
+            lines.append(f"[{i}] {title}: {text}")
+        return "\n".join(lines)
+
+    # ---- incremental maintenance from ORM session events ----
+    def _after_flush(self, session, flush_context):
+        if not self.built:
+            return
+        tracked = tuple(self.sources)
+        pending = session.info.setdefault('retrieval_pending', {})
+        for row in list(session.new) + list(session.dirty):
+            if isinstance(row, self.crop_model):
+                self.crop_names[row.id] = row.name
+            elif isinstance(row, tracked):
+                # Capture text now: attributes are expired after commit
+                pending[self._owner(row)] = passages_for(row, self.crop_names.get(row.crop_id))
+        for row in session.deleted:
+            if isinstance(row, tracked):
+                pending[self._owner(row)] = []
+
+    def _after_commit(self, session):
+        pending = session.info.pop('retrieval_pending', None)
+        if not pending:
+            return
+        for owner, passages in pending.items():
+            self.index.replace_owner(owner, passages)
+        metrics.set_gauge("retrieval_passages", len(self.index.docs), aggregate="max")
+        logging.info("Retrieval index updated for %d rows", len(pending))
+
+    def _after_rollback(self, session):
+        session.info.pop('retrieval_pending', None)
+
+    def init_app(self, app, crop_model, sources) -> None:
+        self.crop_model = crop_model
+        self.sources = tuple(sources)
+        event.listen(Session, 'after_flush', self._after_flush)
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_rollback', self._after_rollback)
+
+
+retriever = CropRetriever()
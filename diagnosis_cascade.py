@@ -0,0 +1,119 @@
+# diagnosis_cascade.py - Confidence gate between the local CNN and remote vision models
+"""
+The image-diagnosis endpoints run the local classifier (disease_model) first. When its
+verdict is trustworthy, the answer is returned straight away and no remote call is made.
+A verdict is trustworthy when all of these hold:
+
+  * top-1 probability >= CASCADE_CONFIDENCE_THRESHOLD
+  * top-1 minus top-2 probability >= CASCADE_MIN_MARGIN
+  * normalized softmax entropy <= CASCADE_MAX_ENTROPY (a high value suggests an
+    out-of-distribution photo: a crop or scene the CNN was not trained on)
+
+Anything else escalates to the Ollama vision model or Gemini. Either way structured_data
+uses the keys the Gemini endpoint already returns (plant_name, disease_status,
+disease_name, confidence, symptoms, treatment, prevention). Escalated answers also carry
+the CNN's verdict under local_prediction.
+
+diagnosis_tier_total{tier, reason} shows how much traffic each tier absorbs.
+"""
+import os
+
+import metrics
+from disease_model import advice_for
+
+CASCADE_ENABLED = os.environ.get('CASCADE_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'on'}
+CASCADE_CONFIDENCE_THRESHOLD = float(os.environ.get('CASCADE_CONFIDENCE_THRESHOLD', '0.85'))
+CASCADE_MIN_MARGIN = float(os.environ.get('CASCADE_MIN_MARGIN', '0.3'))
+CASCADE_MAX_ENTROPY = float(os.environ.get('CASCADE_MAX_ENTROPY', '0.35'))
+
+LOCAL_MODEL_NAME = "local-cnn"
+PROBABILITY_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99, 1.0)
+
+
+def assess(result: dict):
+    """(confident, reason) for a classifier result from disease_model."""
+    top_k = result.get("top_k") or []
+    confidence = result.get("confidence", 0.0)
+    margin = confidence - (top_k[1]["probability"] if len(top_k) > 1 else 0.0)
+    metrics.observe("diagnosis_local_confidence", confidence, buckets=PROBABILITY_BUCKETS)
+    if result.get("prediction") == "Unknown":
+        return False, "unknown_label"
+    if result.get("entropy", 0.0) > CASCADE_MAX_ENTROPY:
+        return False, "out_of_distribution"
+    if confidence < CASCADE_CONFIDENCE_THRESHOLD:
+        return False, "low_confidence"
+    if margin < CASCADE_MIN_MARGIN:
+        return False, "ambiguous"
+    return True, "confident"
+
+
+def confidence_level(probability: float) -> str:
+    if probability >= 0.9:
+        return "High"
+    if probability >= 0.6:
+        return "Medium"
+    return "Low"
+
+
+def split_label(label: str):
+    """"Tomato___Early_blight" -> ("Tomato", "Early blight")."""
+    plant, _, disease = label.partition('___')
+    return plant.replace('_', ' ').strip(), disease.replace('_', ' ').strip()
+
+
+def local_structured_data(result: dict) -> dict:
+    plant, disease = split_label(result["prediction"])
+    healthy = disease.lower() == 'healthy'
+    return {
+        "plant_name": plant or "Unknown",
+        "disease_status": "Healthy" if healthy else "Diseased",
+        "disease_name": "Healthy" if healthy else (disease or "Unknown"),
+        "confidence": f"{confidence_level(result['confidence'])} ({result['confidence']:.0%})",
+        "symptoms": [],
+        "treatment": [advice_for(result["prediction"])],
+        "prevention": [],
+    }
+
+
+def local_summary(result: dict) -> dict:
+    """Compact local verdict attached to escalated responses."""
+    return {"model": LOCAL_MODEL_NAME, "prediction": result["prediction"], "confidence": result["confidence"],
+            "entropy": result.get("entropy"), "top_k": result.get("top_k")}
+
+
+def merge_structured_data(remote: dict, result: dict = None) -> dict:
+    """Remote structured_data normalized to the Gemini keys, plus the CNN's verdict (if any).
+
+    Gaps are not filled from the CNN: it was escalated precisely because it was unsure.
+    """
+    remote = dict(remote or {})
+    plant = remote.pop("plant", None)  # Ollama's JSON uses plant / disease
+    disease = remote.pop("disease", None)
+    merged = {
+        "plant_name": remote.pop("plant_name", None) or plant or "Unknown",
+        "disease_status": remote.pop("disease_status", None) or "Unknown",
+        "disease_name": remote.pop("disease_name", None) or disease or "Unknown",
+        "confidence": remote.pop("confidence", None) or "Unknown",
+        "symptoms": remote.pop("symptoms", None) or [],
+        "treatment": remote.pop("treatment", None) or [],
+        "prevention": remote.pop("prevention", None) or [],
+    }
+    merged.update(remote)  # keep any extra keys the remote model produced
+    if result is not None:
+        merged["local_prediction"] = local_summary(result)
+    return merged
+
+
+def local_summary_text(result: dict) -> str:
+    sd = local_structured_data(result)
+    status = sd["disease_status"] if sd["disease_status"] == "Healthy" else f"{sd['disease_status']} - {sd['disease_name']}"
+    return f"""🌿 **Plant Analysis Results**
+
+**Plant:** {sd['plant_name']}
+**Status:** {status}
+**Confidence:** {sd['confidence']}
+**Treatment:** {sd['treatment'][0]}"""
+
+
+def record_tier(tier: str, reason: str) -> None:
+    metrics.inc("diagnosis_tier_total", tier=tier, reason=reason)
@@ -0,0 +1,93 @@
+# disease_batcher.py - Dynamic micro-batching for local disease-model inference
+"""
+Concurrent /api/detect-disease requests are gathered into one forward pass instead of
+each running at batch size 1. A request preprocesses its image on its own thread,
+enqueues the tensor and waits. A single worker thread takes the first queued image and
+keeps collecting for up to DISEASE_BATCH_WAIT_MS or until DISEASE_MAX_BATCH images are
+queued. It then runs one batched forward pass and hands each caller its own result.
+
+With DISEASE_MAX_BATCH=1 batching is off and predictions run inline on the request thread.
+
+Metrics: disease_batch_size, disease_batch_wait_seconds (time queued before the forward
+pass), disease_request_seconds (end-to-end per image), disease_images_total (rate() gives
+throughput) and the disease_batch_queue_depth gauge.
+"""
+from concurrent.futures import Future
+import logging
+import os
+import queue
+import threading
+import time
+
+import metrics
+from disease_model import classifier as default_classifier
+
+DISEASE_MAX_BATCH = int(os.environ.get('DISEASE_MAX_BATCH', '16'))
+DISEASE_BATCH_WAIT_MS = float(os.environ.get('DISEASE_BATCH_WAIT_MS', '5'))
+DISEASE_BATCH_TIMEOUT = float(os.environ.get('DISEASE_BATCH_TIMEOUT', '30'))
+
+
+class DiseaseBatcher:
+    def __init__(self, classifier=default_classifier, max_batch=DISEASE_MAX_BATCH, wait_ms=DISEASE_BATCH_WAIT_MS):
+        self.classifier = classifier
+        self.max_batch = max(1, max_batch)
+        self.wait = max(0.0, wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="disease-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> list:
+        """Block for the first item, then gather more until the batch is full or the window closes."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            metrics.set_gauge("disease_batch_queue_depth", self._queue.qsize())
+            started = time.monotonic()
+            for _, _, enqueued in batch:
+                metrics.observe("disease_batch_wait_seconds", started - enqueued)
+            metrics.observe("disease_batch_size", len(batch), buckets=metrics.COUNT_BUCKETS)
+            try:
+                results = self.classifier.predict_tensors([tensor for tensor, _, _ in batch])
+            except Exception as e:
+                logging.error("Batched disease inference failed (%d images): %s", len(batch), e)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def predict(self, image, timeout: float = DISEASE_BATCH_TIMEOUT) -> dict:
+        """Classify one PIL RGB image, sharing a forward pass with concurrent callers."""
+        start = time.monotonic()
+        try:
+            if self.max_batch == 1:
+                return self.classifier.predict(image)
+            tensor = self.classifier.preprocess(image)
+            future = Future()
+            self._ensure_worker()
+            self._queue.put((tensor, future, time.monotonic()))
+            return future.result(timeout=timeout)
+        finally:
+            metrics.inc("disease_images_total")
+            metrics.observe("disease_request_seconds", time.monotonic() - start)
+
+
+batcher = DiseaseBatcher()
@@ -0,0 +1,272 @@
+# disease_model.py - Local CNN plant-disease classifier for /api/detect-disease
+"""
+The model is loaded once per process on first use from DISEASE_MODEL_PATH. Accepted
+formats are a TorchScript archive, a pickled nn.Module, or a state_dict for the
+torchvision architecture named by DISEASE_MODEL_ARCH (optionally wrapped as
+{"state_dict": ..., "classes": [...]}).
+
+Class names come from the checkpoint, from DISEASE_CLASSES_PATH (a JSON list, or a
+{"0": "Apple___Apple_scab", ...} map), or default to the sorted DISEASE_ADVICE keys. The
+sorted keys match torchvision ImageFolder's class order for a PlantVillage-style dataset.
+
+Inference runs on CPU under torch.inference_mode with DISEASE_NUM_THREADS intra-op
+threads and returns softmax top-k probabilities.
+
+Variants: export_disease_model.py writes fp32 / int8 / channels_last TorchScript builds
+and an ONNX export next to the base model, listed in a manifest
+(DISEASE_VARIANTS_MANIFEST). Set DISEASE_MODEL_VARIANT to one of its names to serve that
+build instead of DISEASE_MODEL_PATH. ONNX variants run on onnxruntime. Use
+benchmark_disease_model.py to choose a variant for each machine.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+import metrics
+
+try:
+    import torch
+    import torch.nn.functional as F
+    from torchvision import models as tv_models, transforms
+except ImportError:  # torch is optional; the endpoint answers 503 without it
+    torch = None
+
+try:
+    import onnxruntime
+except ImportError:  # only needed for the "onnx" variant
+    onnxruntime = None
+
+DISEASE_MODEL_PATH = os.environ.get('DISEASE_MODEL_PATH', os.path.join('models', 'plant_disease_model.pt'))
+DISEASE_MODEL_ARCH = os.environ.get('DISEASE_MODEL_ARCH', 'resnet18')
+DISEASE_CLASSES_PATH = os.environ.get('DISEASE_CLASSES_PATH', '')
+DISEASE_IMAGE_SIZE = int(os.environ.get('DISEASE_IMAGE_SIZE', '224'))
+DISEASE_TOP_K = int(os.environ.get('DISEASE_TOP_K', '3'))
+DISEASE_NUM_THREADS = int(os.environ.get('DISEASE_NUM_THREADS', str(min(4, os.cpu_count() or 1))))
+DISEASE_INTEROP_THREADS = int(os.environ.get('DISEASE_INTEROP_THREADS', '1'))
+DISEASE_RESIZE = int(DISEASE_IMAGE_SIZE * 256 / 224)  # short edge before the center crop
+DISEASE_MODEL_VARIANT = os.environ.get('DISEASE_MODEL_VARIANT', '')
+DISEASE_VARIANTS_MANIFEST = os.environ.get(
+    'DISEASE_VARIANTS_MANIFEST', os.path.splitext(DISEASE_MODEL_PATH)[0] + '.variants.json')
+
+DISEASE_ADVICE = {
+    "Apple___Apple_scab": "Remove infected leaves and apply fungicides. Maintain good air circulation.",
+    "Apple___Black_rot": "Prune infected branches and apply copper-based fungicides.",
+    "Apple___Cedar_apple_rust": "Remove nearby cedar trees and apply fungicides during bloom.",
+    "Apple___healthy": "Plant is healthy. Continue proper care and maintenance.",
+    "Corn___Common_rust": "Use resistant hybrids and apply triazole fungicides.",
+    "Corn___healthy": "Plant is healthy. Continue proper care and maintenance.",
+    "Potato___Early_blight": "Rotate crops and apply chlorothalonil fungicides.",
+    "Potato___Late_blight": "Avoid excess irrigation and apply metalaxyl + mancozeb.",
+    "Potato___healthy": "Plant is healthy. Continue proper care and maintenance.",
+    "Tomato___Bacterial_spot": "Use disease-free seeds and apply copper-based bactericides.",
+    "Tomato___Early_blight": "Remove infected leaves and apply chlorothalonil fungicides.",
+    "Tomato___Late_blight": "Improve air circulation and apply copper fungicides.",
+    "Tomato___Leaf_Mold": "Improve ventilation and avoid overhead irrigation.",
+    "Tomato___healthy": "Plant is healthy. Continue proper care and maintenance."
+}
+DEFAULT_ADVICE = "Consult with a plant disease expert for specific treatment recommendations."
+
+
+def advice_for(label: str) -> str:
+    return DISEASE_ADVICE.get(label, DEFAULT_ADVICE)
+
+
+def _load_classes(checkpoint_classes=None) -> list:
+    if checkpoint_classes:
+        return list(checkpoint_classes)
+    if DISEASE_CLASSES_PATH:
+        with open(DISEASE_CLASSES_PATH, encoding='utf-8') as fh:
+            data = json.load(fh)
+        if isinstance(data, dict):
+            return [data[k] for k in sorted(data, key=int)]
+        return list(data)
+    return sorted(DISEASE_ADVICE)
+
+
+def _build_arch(num_classes: int):
+    if DISEASE_MODEL_ARCH.startswith('resnet'):
+        model = getattr(tv_models, DISEASE_MODEL_ARCH)(weights=None)
+        model.fc = torch.nn.Linear(model.fc.in_features, num_classes)
+    elif DISEASE_MODEL_ARCH.startswith(('mobilenet', 'efficientnet')):
+        model = getattr(tv_models, DISEASE_MODEL_ARCH)(weights=None)
+        last = model.classifier[-1]
+        model.classifier[-1] = torch.nn.Linear(last.in_features, num_classes)
+    else:
+        raise ValueError(f"Unsupported DISEASE_MODEL_ARCH {DISEASE_MODEL_ARCH!r}")
+    return model
+
+
+def load_manifest(path: str = DISEASE_VARIANTS_MANIFEST) -> dict:
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+class OnnxModel:
+    """onnxruntime session behind the same call interface as a torch module."""
+
+    def __init__(self, path: str):
+        if onnxruntime is None:
+            raise RuntimeError("onnxruntime is not installed")
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = DISEASE_NUM_THREADS
+        options.inter_op_num_threads = DISEASE_INTEROP_THREADS
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, batch):
+        return torch.from_numpy(self.session.run(None, {self.input_name: batch.numpy()})[0])
+
+
+class DiseaseClassifier:
+    def __init__(self, path: str = DISEASE_MODEL_PATH, variant: str = DISEASE_MODEL_VARIANT,
+                 manifest_path: str = DISEASE_VARIANTS_MANIFEST):
+        self.path = path
+        self.variant = variant
+        self.manifest_path = manifest_path
+        self.format = None  # from the manifest entry: torchscript, onnx or checkpoint
+        self.channels_last = False
+        self.model = None
+        self.classes = []
+        self.transform = None
+        self.error = None
+        self._manifest_classes = None
+        self._load_failed = False
+        self._lock = threading.Lock()
+
+    def _resolve_variant(self) -> None:
+        manifest = load_manifest(self.manifest_path)
+        entry = manifest["variants"][self.variant]
+        self.path = os.path.join(os.path.dirname(self.manifest_path), entry["file"])
+        self.format = entry.get("format")
+        self.channels_last = bool(entry.get("channels_last"))
+        self._manifest_classes = manifest.get("classes")
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        torch.set_num_threads(DISEASE_NUM_THREADS)
+        try:
+            torch.set_num_interop_threads(DISEASE_INTEROP_THREADS)
+        except RuntimeError:
+            pass  # already set for this process (e.g. by another model)
+
+        checkpoint_classes = self._manifest_classes
+        if self.format == 'onnx':
+            model = OnnxModel(self.path)
+        elif self.format == 'torchscript':
+            model = torch.jit.load(self.path, map_location='cpu')
+        else:
+            model, stored_classes = self._load_checkpoint()
+            checkpoint_classes = checkpoint_classes or stored_classes
+        self.classes = _load_classes(checkpoint_classes)
+        if self.channels_last and isinstance(model, torch.nn.Module):
+            model = model.to(memory_format=torch.channels_last)
+        self.transform = transforms.Compose([
+            transforms.Resize(DISEASE_RESIZE),
+            transforms.CenterCrop(DISEASE_IMAGE_SIZE),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+        ])
+        # Published last: ready() checks self.model without the lock, so everything
+        # preprocess() / predict() need must already be in place
+        self.model = model.eval()
+        elapsed = time.perf_counter() - start
+        metrics.observe("disease_model_load_seconds", elapsed, variant=self.variant or "base")
+        logging.info("Disease model %s loaded from %s (%d classes, %d threads) in %.2fs",
+                     self.variant or "base", self.path, len(self.classes), DISEASE_NUM_THREADS, elapsed)
+
+    def _load_checkpoint(self):
+        """TorchScript archive, pickled module or state_dict at self.path -> (module, classes or None)."""
+        checkpoint_classes = None
+        try:
+            model = torch.jit.load(self.path, map_location='cpu')
+        except Exception:
+            try:
+                checkpoint = torch.load(self.path, map_location='cpu', weights_only=True)
+            except Exception:
+                # A pickled nn.Module needs full unpickling; the file is a local, operator-provided artifact
+                checkpoint = torch.load(self.path, map_location='cpu', weights_only=False)
+            if isinstance(checkpoint, torch.nn.Module):
+                model = checkpoint
+            else:
+                if isinstance(checkpoint, dict) and 'state_dict' in checkpoint:
+                    checkpoint_classes = checkpoint.get('classes')
+                    checkpoint = checkpoint['state_dict']
+                classes = _load_classes(checkpoint_classes)
+                model = _build_arch(len(classes))
+                model.load_state_dict(checkpoint)
+        return model, checkpoint_classes
+
+    def ready(self) -> bool:
+        """Load the model on first call; False when torch or the model file is unavailable.
+
+        A failed load is not retried until the process restarts."""
+        if self.model is not None:
+            return True
+        if self._load_failed:
+            return False
+        if torch is None:
+            self.error = "PyTorch is not installed"
+            return False
+        if self.variant and self.format is None:
+            try:
+                self._resolve_variant()
+            except (OSError, KeyError, ValueError) as e:
+                self.error = f"Model variant {self.variant!r} not found in {self.manifest_path}: {e}"
+                self._load_failed = True
+                return False
+        if not os.path.exists(self.path):
+            self.error = f"Model file not found: {self.path}"
+            return False
+        with self._lock:
+            if self.model is None:
+                try:
+                    self._load()
+                except Exception as e:
+                    self.error = str(e)
+                    self._load_failed = True
+                    logging.error("Disease model load failed: %s", e)
+                    return False
+        return True
+
+    def preprocess(self, image):
+        """PIL RGB image -> normalized CHW tensor (safe to run on the request thread)."""
+        return self.transform(image)
+
+    def predict_tensors(self, tensors, top_k: int = DISEASE_TOP_K) -> list:
+        """Classify preprocessed tensors in one forward pass; one result dict per tensor."""
+        batch = torch.stack(list(tensors))
+        if self.channels_last:
+            batch = batch.contiguous(memory_format=torch.channels_last)
+        start = time.perf_counter()
+        with torch.inference_mode():
+            probs = F.softmax(self.model(batch).float(), dim=1)
+            top_p, top_i = probs.topk(min(top_k, probs.shape[1]), dim=1)
+            # Entropy normalized to [0, 1]; near 1 means the model has no idea (out-of-distribution)
+            entropy = -(probs * probs.clamp_min(1e-12).log()).sum(dim=1) / math.log(max(2, probs.shape[1]))
+        metrics.observe("disease_inference_seconds", time.perf_counter() - start)
+        results = []
+        for p_row, i_row, h in zip(top_p.tolist(), top_i.tolist(), entropy.tolist()):
+            ranked = [{"label": self.label(i), "probability": round(p, 4)} for p, i in zip(p_row, i_row)]
+            results.append({"prediction": ranked[0]["label"], "confidence": ranked[0]["probability"],
+                            "top_k": ranked, "entropy": round(h, 4)})
+        return results
+
+    def predict_batch(self, images, top_k: int = DISEASE_TOP_K) -> list:
+        """Classify PIL RGB images in one forward pass; one result dict per image."""
+        return self.predict_tensors([self.preprocess(img) for img in images], top_k)
+
+    def predict(self, image, top_k: int = DISEASE_TOP_K) -> dict:
+        return self.predict_batch([image], top_k)[0]
+
+    def label(self, index: int) -> str:
+        return self.classes[index] if 0 <= index < len(self.classes) else "Unknown"
+
+
+classifier = DiseaseClassifier()
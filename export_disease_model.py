@@ -0,0 +1,113 @@
+"""
+Export CPU-friendly variants of the plant-disease model.
+
+Starting from the base model at DISEASE_MODEL_PATH (any format disease_model.py loads),
+this writes next to it:
+
+    <stem>.fp32.ts      TorchScript, traced, frozen and optimized for inference
+    <stem>.int8.ts      dynamic INT8 quantization (nn.Linear layers), TorchScript
+    <stem>.cl.ts        channels_last TorchScript (pairs with channels_last inputs)
+    <stem>.onnx         ONNX with a dynamic batch axis, for onnxruntime
+
+It also writes <stem>.variants.json, the manifest that disease_model.py reads when
+DISEASE_MODEL_VARIANT is set. Dynamic quantization only covers Linear layers. On a
+ResNet most of the cost is in the convolutions, so always benchmark the variants with
+benchmark_disease_model.py before switching.
+
+Usage:
+    python export_disease_model.py
+    python export_disease_model.py --model models/plant_disease_model.pt --variants fp32 int8 onnx
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import torch
+
+import disease_model
+from disease_model import DISEASE_IMAGE_SIZE, DISEASE_MODEL_PATH, DiseaseClassifier
+
+VARIANTS = ('fp32', 'int8', 'channels_last', 'onnx')
+SUFFIXES = {'fp32': '.fp32.ts', 'int8': '.int8.ts', 'channels_last': '.cl.ts', 'onnx': '.onnx'}
+
+
+def _trace(model, example, channels_last=False):
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+        example = example.contiguous(memory_format=torch.channels_last)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    return torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+
+
+def export_variant(name, model, example, out_path):
+    if name == 'fp32':
+        torch.jit.save(_trace(model, example), out_path)
+    elif name == 'channels_last':
+        torch.jit.save(_trace(model, example, channels_last=True), out_path)
+    elif name == 'int8':
+        quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        with torch.no_grad():
+            traced = torch.jit.trace(quantized, example)
+        torch.jit.save(torch.jit.freeze(traced.eval()), out_path)
+    elif name == 'onnx':
+        torch.onnx.export(model, example, out_path, input_names=['input'], output_names=['logits'],
+                          dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}}, opset_version=17)
+    return {"file": os.path.basename(out_path),
+            "format": 'onnx' if name == 'onnx' else 'torchscript',
+            "channels_last": name == 'channels_last'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export quantized / TorchScript / ONNX disease-model variants")
+    parser.add_argument('--model', default=DISEASE_MODEL_PATH, help="Base model (default: DISEASE_MODEL_PATH)")
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument('--output-dir', help="Where to write variants (default: next to the base model)")
+    args = parser.parse_args()
+
+    base = DiseaseClassifier(path=args.model, variant='')
+    if not base.ready():
+        print(f"Cannot load base model: {base.error}", file=sys.stderr)
+        sys.exit(1)
+    model = base.model
+    if isinstance(model, torch.jit.ScriptModule):
+        print("Note: base model is TorchScript; int8 / ONNX export needs an eager checkpoint", file=sys.stderr)
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.model))
+    stem = os.path.splitext(os.path.basename(args.model))[0]
+    manifest_path = os.path.join(output_dir, f"{stem}.variants.json")
+    manifest = {"variants": {}}
+    if os.path.exists(manifest_path):
+        manifest = disease_model.load_manifest(manifest_path)
+    manifest["base_model"] = os.path.relpath(os.path.abspath(args.model), output_dir)
+    manifest["classes"] = base.classes
+    manifest["image_size"] = DISEASE_IMAGE_SIZE
+
+    example = torch.randn(1, 3, DISEASE_IMAGE_SIZE, DISEASE_IMAGE_SIZE)
+    failed = []
+    for name in args.variants:
+        out_path = os.path.join(output_dir, stem + SUFFIXES[name])
+        start = time.perf_counter()
+        try:
+            entry = export_variant(name, model, example, out_path)
+        except Exception as e:
+            failed.append(name)
+            print(f"  ! {name}: {e}", file=sys.stderr)
+            continue
+        entry["exported_at"] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        entry["size_bytes"] = os.path.getsize(out_path)
+        manifest["variants"][name] = entry
+        print(f"  {name:<14} {entry['file']:<32} {entry['size_bytes'] / 1e6:7.1f} MB  "
+              f"({time.perf_counter() - start:.1f}s)")
+
+    with open(manifest_path, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2)
+    print(f"Manifest written to {manifest_path}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Local stand-in for the Gemini REST API, for exercising gemini_client.py without the network.
+
+Answers POST /v1beta/models/<model>:generateContent in the shape the google.generativeai
+REST transport expects. How it answers depends on the mode:
+
+    ok      200 with a canned plant-disease analysis
+    slow    like ok, after --delay seconds (exercises GEMINI_TIMEOUT / GEMINI_DEADLINE)
+    error   503 UNAVAILABLE on every call (opens the circuit breaker)
+    flaky   503 on the first --fail-count calls after a mode change, then ok (retries)
+    bad     400 INVALID_ARGUMENT (non-retryable; must not trip the breaker)
+
+The mode can be switched at runtime with POST /_mode {"mode": "...", "delay": 5}.
+GET /_stats returns the number of generateContent calls received.
+
+Usage:
+    python fake_gemini_server.py --port 8765 --mode flaky --fail-count 2
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765 python app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODES = ('ok', 'slow', 'error', 'flaky', 'bad')
+
+ANALYSIS_TEXT = """1. Plant/Crop Name: Tomato
+2. Disease Status: Diseased
+3. Disease Name: Early blight
+4. Confidence Level: High
+5. Symptoms: Concentric brown rings on older leaves
+6. Treatment: Remove infected leaves; apply a copper-based fungicide
+7. Prevention: Rotate crops and avoid overhead watering"""
+
+ERRORS = {
+    503: {"code": 503, "message": "The model is overloaded. Please try again later.", "status": "UNAVAILABLE"},
+    400: {"code": 400, "message": "Request contains an invalid argument.", "status": "INVALID_ARGUMENT"},
+}
+
+
+class FakeGeminiState:
+    def __init__(self, mode='ok', delay=5.0, fail_count=2):
+        self.lock = threading.Lock()
+        self.set_mode(mode, delay, fail_count)
+
+    def set_mode(self, mode, delay=None, fail_count=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}; expected one of {', '.join(MODES)}")
+        with self.lock:
+            self.mode = mode
+            self.delay = self.delay if delay is None else float(delay)
+            self.fail_count = self.fail_count if fail_count is None else int(fail_count)
+            self.calls = 0
+
+    def next_call(self):
+        """(status, delay) for the next generateContent call."""
+        with self.lock:
+            self.calls += 1
+            if self.mode == 'error' or (self.mode == 'flaky' and self.calls <= self.fail_count):
+                return 503, 0.0
+            if self.mode == 'bad':
+                return 400, 0.0
+            return 200, self.delay if self.mode == 'slow' else 0.0
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client timed out and hung up (slow mode)
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def do_GET(self):
+            if self.path == '/_stats':
+                return self._send(200, {"mode": state.mode, "calls": state.calls})
+            self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        def do_POST(self):
+            if self.path == '/_mode':
+                body = self._body()
+                try:
+                    state.set_mode(body.get('mode', 'ok'), body.get('delay'), body.get('fail_count'))
+                except ValueError as e:
+                    return self._send(400, {"error": str(e)})
+                return self._send(200, {"mode": state.mode})
+            if not self.path.split('?')[0].endswith(':generateContent'):
+                return self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+            self._body()
+            status, delay = state.next_call()
+            if delay:
+                time.sleep(delay)
+            if status != 200:
+                return self._send(status, {"error": ERRORS[status]})
+            self._send(200, {
+                "candidates": [{
+                    "content": {"parts": [{"text": ANALYSIS_TEXT}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {"promptTokenCount": 300, "candidatesTokenCount": 80, "totalTokenCount": 380},
+            })
+
+        def log_message(self, fmt, *args):  # keep test output readable
+            pass
+
+    return Handler
+
+
+def serve(host='127.0.0.1', port=8765, mode='ok', delay=5.0, fail_count=2):
+    """Start the stand-in on a daemon thread; returns (server, state). Port 0 picks a free port."""
+    state = FakeGeminiState(mode, delay, fail_count)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="fake-gemini").start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini generateContent API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--mode', choices=MODES, default='ok')
+    parser.add_argument('--delay', type=float, default=5.0, help="Seconds to wait per call in slow mode")
+    parser.add_argument('--fail-count', type=int, default=2, help="503s before succeeding in flaky mode")
+    args = parser.parse_args()
+
+    server, _ = serve(args.host, args.port, args.mode, args.delay, args.fail_count)
+    print(f"Fake Gemini listening on http://{args.host}:{server.server_address[1]} (mode={args.mode})")
+    print(f"Point the app at it with GEMINI_API_ENDPOINT=http://{args.host}:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
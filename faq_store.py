@@ -0,0 +1,95 @@
+# faq_store.py - Pre-generated crop FAQ answers served instantly by /api/chatbot
+"""
+Answers are generated offline by generate_faq_answers.py and stored in the crop_faqs
+table together with the model and FAQ_PROMPT_VERSION that produced them. FAQs belong to a
+crop (or to none, for general questions), so the same question can have a different answer
+per crop. At request time, a single-turn question whose normalized form (see
+answer_cache.normalize_question) matches a stored question for the crop in context - or a
+crop-less one when there is no crop - is answered from an in-memory map. The map is reloaded from the
+database every FAQ_RELOAD_INTERVAL seconds. Only answers for the current prompt version
+are served, so bumping FAQ_PROMPT_VERSION retires old answers until they are regenerated.
+
+With CHAT_QUESTION_LOG_PATH set, single-turn questions are appended there (text only, no
+user or IP) so the batch job can mine frequent questions with --from-chat-log.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import metrics
+from answer_cache import normalize_question
+
+FAQ_ENABLED = os.environ.get('FAQ_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'on'}
+FAQ_PROMPT_VERSION = os.environ.get('FAQ_PROMPT_VERSION', 'v1')
+FAQ_RELOAD_INTERVAL = int(os.environ.get('FAQ_RELOAD_INTERVAL', '60'))
+CHAT_QUESTION_LOG_PATH = os.environ.get('CHAT_QUESTION_LOG_PATH', '')
+
+_log_lock = threading.Lock()
+
+
+def question_key(question: str) -> str:
+    """Stable key for a question: sha256 of its normalized text ("" when nothing is left)."""
+    normalized = normalize_question(question)
+    return hashlib.sha256(normalized.encode()).hexdigest() if normalized else ""
+
+
+def log_question(question: str) -> None:
+    if not CHAT_QUESTION_LOG_PATH:
+        return
+    line = json.dumps({"ts": round(time.time(), 3), "question": question}, ensure_ascii=False) + '\n'
+    try:
+        with _log_lock:
+            with open(CHAT_QUESTION_LOG_PATH, 'a', encoding='utf-8') as fh:
+                fh.write(line)
+    except OSError as e:
+        logging.debug("Question log write failed: %s", e)
+
+
+class FaqStore:
+    def __init__(self):
+        self.model = None
+        self._answers = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app, faq_model) -> None:
+        self.model = faq_model
+
+    def _reload(self) -> None:
+        rows = (self.model.query
+                .filter(self.model.answer.isnot(None), self.model.prompt_version == FAQ_PROMPT_VERSION)
+                .with_entities(self.model.crop_id, self.model.question_key, self.model.answer)
+                .all())
+        self._answers = {(crop_id, key): answer for crop_id, key, answer in rows if answer}
+        metrics.set_gauge("faq_answers", len(self._answers), aggregate="max")
+
+    def invalidate(self) -> None:
+        self._loaded_at = 0.0
+
+    def lookup(self, question: str, crop_id: int = None):
+        """Stored answer for the question about crop_id (None: crop-less FAQs only), or None.
+
+        Needs an app context on reload.
+        """
+        if not FAQ_ENABLED or self.model is None:
+            return None
+        key = question_key(question)
+        if not key:
+            return None
+        if time.monotonic() - self._loaded_at > FAQ_RELOAD_INTERVAL and self._lock.acquire(blocking=False):
+            try:
+                self._reload()
+            except Exception as e:
+                logging.warning("FAQ reload failed: %s", e)
+            finally:
+                self._loaded_at = time.monotonic()
+                self._lock.release()
+        answer = self._answers.get((crop_id, key))
+        metrics.inc("faq_requests_total", result="hit" if answer else "miss")
+        return answer
+
+
+faq_store = FaqStore()
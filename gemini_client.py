@@ -0,0 +1,183 @@
+# gemini_client.py - Managed Gemini vision client: shared model, deadlines, retries, circuit breaker
+"""
+One GenerativeModel per process, created on first use. generate() enforces:
+
+  * a per-attempt timeout (GEMINI_TIMEOUT) inside an overall deadline (GEMINI_DEADLINE)
+  * up to GEMINI_MAX_RETRIES retries of retryable failures (429, 500, 503, 504,
+    connection errors and timeouts), with full-jitter exponential backoff
+  * a circuit breaker: after GEMINI_BREAKER_THRESHOLD consecutive failed calls, the
+    breaker opens and calls fail fast with GeminiUnavailable for GEMINI_BREAKER_COOLDOWN
+    seconds. Then one probe call is let through (half-open). Success closes the breaker;
+    failure re-opens it.
+
+Callers turn GeminiUnavailable into a cached or degraded answer (see _diagnose in app.py).
+
+GEMINI_API_ENDPOINT points the client at another host, e.g. the local stand-in server in
+fake_gemini_server.py (REST transport).
+"""
+import logging
+import os
+import random
+import threading
+import time
+
+import google.generativeai as genai
+
+import metrics
+
+try:
+    from google.api_core import exceptions as api_exceptions
+    RETRYABLE_API_ERRORS = (api_exceptions.TooManyRequests, api_exceptions.ResourceExhausted,
+                            api_exceptions.InternalServerError, api_exceptions.ServiceUnavailable,
+                            api_exceptions.DeadlineExceeded)
+except ImportError:
+    RETRYABLE_API_ERRORS = ()
+try:
+    import requests
+    RETRYABLE_TRANSPORT_ERRORS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+except ImportError:
+    RETRYABLE_TRANSPORT_ERRORS = ()
+
+RETRYABLE_ERRORS = RETRYABLE_API_ERRORS + RETRYABLE_TRANSPORT_ERRORS + (TimeoutError, ConnectionError)
+
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
+GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-pro-latest')
+GEMINI_API_ENDPOINT = os.environ.get('GEMINI_API_ENDPOINT', '')
+GEMINI_TIMEOUT = float(os.environ.get('GEMINI_TIMEOUT', '20'))
+GEMINI_DEADLINE = float(os.environ.get('GEMINI_DEADLINE', '45'))
+GEMINI_MAX_RETRIES = int(os.environ.get('GEMINI_MAX_RETRIES', '2'))
+GEMINI_RETRY_BASE = float(os.environ.get('GEMINI_RETRY_BASE', '0.5'))
+GEMINI_BREAKER_THRESHOLD = int(os.environ.get('GEMINI_BREAKER_THRESHOLD', '5'))
+GEMINI_BREAKER_COOLDOWN = float(os.environ.get('GEMINI_BREAKER_COOLDOWN', '30'))
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def is_configured(api_key: str = GEMINI_API_KEY) -> bool:
+    return bool(api_key) and api_key != 'YOUR_GEMINI_API_KEY_HERE'
+
+
+class GeminiUnavailable(Exception):
+    """Gemini cannot answer now (breaker open or retries exhausted); retry after `retry_after` s."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, int(retry_after))
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold=GEMINI_BREAKER_THRESHOLD, cooldown=GEMINI_BREAKER_COOLDOWN):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logging.warning("Circuit %s: %s -> %s", self.name, self.state, state)
+            self.state = state
+        metrics.set_gauge("circuit_breaker_state", BREAKER_STATES[state], aggregate="max", backend=self.name)
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def allow(self) -> bool:
+        """True if a call may go out now (closed, or the single half-open probe)."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self.retry_after() <= 0:
+                self._set_state("half_open")
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            self._set_state("closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                self._set_state("open")
+
+
+class GeminiClient:
+    def __init__(self, model_name: str = GEMINI_MODEL, api_key: str = GEMINI_API_KEY,
+                 endpoint: str = GEMINI_API_ENDPOINT):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.breaker = CircuitBreaker(f"gemini:{model_name}")
+        self._model = None
+        self._lock = threading.Lock()
+
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    options = {"api_key": self.api_key}
+                    if self.endpoint:
+                        options.update(transport="rest", client_options={"api_endpoint": self.endpoint})
+                    genai.configure(**options)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, contents, deadline: float = GEMINI_DEADLINE, call=None):
+        """generate_content with deadlines, jittered retries and the circuit breaker.
+
+        `call` is an optional llm_telemetry.LLMCall that receives the response usage.
+        Raises GeminiUnavailable when the breaker is open or every attempt failed, and
+        re-raises non-retryable errors (bad request, blocked prompt) unchanged.
+        """
+        if not self.breaker.allow():
+            metrics.inc("gemini_requests_total", outcome="short_circuit")
+            raise GeminiUnavailable("Gemini is temporarily unavailable (circuit open)", self.breaker.retry_after())
+
+        expires = time.monotonic() + deadline
+        attempt = 0
+        while True:
+            remaining = expires - time.monotonic()
+            try:
+                # retry=None: the SDK's own retry would multiply ours and ignore the deadline
+                response = self.model().generate_content(
+                    contents, request_options={"timeout": max(0.1, min(GEMINI_TIMEOUT, remaining)), "retry": None})
+            except RETRYABLE_ERRORS as e:
+                attempt += 1
+                backoff = random.uniform(0, GEMINI_RETRY_BASE * (2 ** attempt))
+                if attempt > GEMINI_MAX_RETRIES or time.monotonic() + backoff >= expires:
+                    self.breaker.record_failure()
+                    metrics.inc("gemini_requests_total", outcome="failed")
+                    logging.warning("Gemini call failed after %d attempts: %s", attempt, e)
+                    raise GeminiUnavailable(f"Gemini did not answer: {type(e).__name__}",
+                                            self.breaker.retry_after() or GEMINI_RETRY_BASE * 4) from e
+                metrics.inc("gemini_retries_total", error=type(e).__name__)
+                time.sleep(backoff)
+                continue
+            except Exception:
+                # The backend answered; the request itself was bad, so the breaker stays closed
+                self.breaker.record_success()
+                metrics.inc("gemini_requests_total", outcome="error")
+                raise
+            self.breaker.record_success()
+            metrics.inc("gemini_requests_total", outcome="ok")
+            if call is not None:
+                call.set_response(response)
+            return response
+
+    def status(self) -> dict:
+        return {"model": self.model_name, "circuit": self.breaker.state, "failures": self.breaker.failures,
+                "retry_after": round(self.breaker.retry_after(), 1)}
+
+
+gemini = GeminiClient()
@@ -0,0 +1,173 @@
+"""
+Offline batch generation of AgriBot FAQ answers (run off-peak, e.g. from cron at night).
+
+Questions come from admin uploads (POST /api/admin/crop_faqs, stored as pending rows), from
+a file (--questions: CSV with crop_id,question columns, JSONL with a "question" field, or
+plain text with one question per line) or are mined from the chat question log
+(--from-chat-log, written when CHAT_QUESTION_LOG_PATH is set). A worker pool answers them
+through the same pipeline as /api/chatbot: strict system prompt, retrieval grounding and
+the LLM queue. Questions tied to a crop are asked about that crop by name, so retrieval
+grounds them in its guides. Each answer is stored in crop_faqs with its model and
+FAQ_PROMPT_VERSION, and /api/chatbot then serves matching questions instantly.
+
+Usage:
+    python generate_faq_answers.py --pending
+    python generate_faq_answers.py --questions rice_faq.csv --crop-id 1 --workers 2
+    python generate_faq_answers.py --from-chat-log chat_questions.jsonl --min-count 3 --top 200
+    python generate_faq_answers.py --stale --model llama3.1:8b
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from sqlalchemy import or_
+
+from answer_cache import normalize_question
+from faq_store import FAQ_PROMPT_VERSION, question_key
+from llm_queue import LLM_MAX_CONCURRENCY
+from model_tiering import LLM_LARGE_MODEL
+
+FAILED_ANSWERS = {"", "Agribot is not working"}
+
+
+def read_question_file(path, default_crop_id=None):
+    """[(question, crop_id)] from CSV (crop_id,question), JSONL or plain text."""
+    items = []
+    with open(path, encoding='utf-8') as fh:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(fh):
+                crop_id = row.get('crop_id') or default_crop_id
+                items.append((row.get('question', ''), int(crop_id) if crop_id else None))
+        elif path.endswith('.jsonl'):
+            for line in fh:
+                if line.strip():
+                    record = json.loads(line)
+                    items.append((record.get('question', ''), record.get('crop_id', default_crop_id)))
+        else:
+            items = [(line, default_crop_id) for line in fh]
+    return [(q.strip(), crop_id) for q, crop_id in items if isinstance(q, str) and q.strip()]
+
+
+def crop_question(question, crop_name=None):
+    """The question as sent to the model: names the crop, which also steers retrieval to its guides."""
+    if not crop_name:
+        return question
+    return f"This question is about growing {crop_name}. Answer it for {crop_name} specifically.\n\n{question}"
+
+
+def mine_chat_log(path, min_count, top):
+    """Most frequent questions in the chat question log, grouped by normalized text."""
+    counts, examples = Counter(), {}
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            try:
+                question = json.loads(line).get('question', '')
+            except ValueError:
+                continue
+            normalized = normalize_question(question)
+            if normalized:
+                counts[normalized] += 1
+                examples.setdefault(normalized, question.strip())
+    return [(examples[n], None) for n, c in counts.most_common(top) if c >= min_count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and store AgriBot FAQ answers offline")
+    parser.add_argument('--pending', action='store_true', help="Answer uploaded questions that have no answer yet")
+    parser.add_argument('--stale', action='store_true',
+                        help="Regenerate answers from another model or prompt version")
+    parser.add_argument('--questions', help="CSV / JSONL / text file of questions to add and answer")
+    parser.add_argument('--crop-id', type=int, help="crop_id for questions without one")
+    parser.add_argument('--from-chat-log', help="Mine frequent questions from this chat question log")
+    parser.add_argument('--min-count', type=int, default=3, help="Minimum occurrences when mining the chat log")
+    parser.add_argument('--top', type=int, default=200, help="At most this many mined questions")
+    parser.add_argument('--model', default=LLM_LARGE_MODEL, help="Model to answer with (default: LLM_LARGE_MODEL)")
+    parser.add_argument('--workers', type=int, default=LLM_MAX_CONCURRENCY)
+    parser.add_argument('--dry-run', action='store_true', help="List the questions that would be answered")
+    args = parser.parse_args()
+    if not (args.pending or args.stale or args.questions or args.from_chat_log):
+        parser.error("nothing to do: pass --pending, --stale, --questions or --from-chat-log")
+
+    import app as app_module
+    CropFaq, Crop, db = app_module.CropFaq, app_module.Crop, app_module.db
+
+    with app_module.app.app_context():
+        incoming = []
+        if args.questions:
+            incoming += [(q, c, 'file') for q, c in read_question_file(args.questions, args.crop_id)]
+        if args.from_chat_log:
+            incoming += [(q, c, 'chat_log') for q, c in mine_chat_log(args.from_chat_log, args.min_count, args.top)]
+
+        targets = {}
+        for question, crop_id, source in incoming:
+            key = question_key(question)
+            if not key or (crop_id, key) in targets:
+                continue
+            row = CropFaq.query.filter_by(crop_id=crop_id, question_key=key).first()
+            if row is None:
+                row = CropFaq(crop_id=crop_id, question=question, question_key=key, source=source)
+                db.session.add(row)
+            targets[(crop_id, key)] = row
+        if args.pending:
+            for row in CropFaq.query.filter(CropFaq.answer.is_(None)).all():
+                targets.setdefault((row.crop_id, row.question_key), row)
+        if args.stale:
+            stale = CropFaq.query.filter(CropFaq.answer.isnot(None),
+                                         or_(CropFaq.prompt_version != FAQ_PROMPT_VERSION,
+                                             CropFaq.model != args.model)).all()
+            for row in stale:
+                targets.setdefault((row.crop_id, row.question_key), row)
+        if not args.dry_run:
+            db.session.commit()
+
+        rows = list(targets.values())
+        print(f"{len(rows)} questions to answer with {args.model} (prompt {FAQ_PROMPT_VERSION}, "
+              f"{args.workers} workers)")
+        if args.dry_run or not rows:
+            for row in rows:
+                print(f"  - {row.question}")
+            return
+        jobs = {row.id: row.question for row in rows}
+        crop_names = dict(Crop.query.with_entities(Crop.id, Crop.name).all())
+        prompts = {row.id: crop_question(row.question, crop_names.get(row.crop_id)) for row in rows}
+
+    def answer(prompt):
+        with app_module.app.app_context():
+            return app_module.generate_agri_response([{"role": "user", "content": prompt}], model=args.model)
+
+    started = time.perf_counter()
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(answer, prompt): faq_id for faq_id, prompt in prompts.items()}
+        with app_module.app.app_context():
+            for future in as_completed(futures):
+                faq_id = futures[future]
+                try:
+                    text_value = (future.result() or "").strip()
+                except Exception as e:
+                    text_value = ""
+                    print(f"  ! {jobs[faq_id][:60]}: {e}", file=sys.stderr)
+                if text_value in FAILED_ANSWERS:
+                    failed += 1
+                    continue
+                row = db.session.get(CropFaq, faq_id)
+                row.answer = text_value
+                row.model = args.model
+                row.prompt_version = FAQ_PROMPT_VERSION
+                row.generated_at = datetime.now()
+                db.session.commit()
+                done += 1
+                if done % 10 == 0:
+                    print(f"  {done}/{len(jobs)} answered ({time.perf_counter() - started:.0f}s)")
+    print(f"Answered {done}, failed {failed} in {time.perf_counter() - started:.0f}s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
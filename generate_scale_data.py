@@ -0,0 +1,364 @@
+"""
+Synthetic data generator for scale testing.
+
+Fills an existing schema (import mysql.sql first, or pass --create-tables to build the
+model tables) with realistic volumes: users, crops with full weekly task plans and
+stages, monitoring sessions, crop_progress_tracking, task_completions and audit_logs.
+Rows are written with explicit ids in large multi-row INSERT batches, or with
+LOAD DATA LOCAL INFILE on MySQL (--method load-data), so a scale database builds in minutes.
+
+Usage:
+    python generate_scale_data.py --profile full
+    python generate_scale_data.py --database-uri sqlite:///scale.db --create-tables --profile medium
+    python generate_scale_data.py --users 5000 --sessions 20000 --progress 150000 --method load-data
+
+Point the endpoint benchmark at the result with:
+    python benchmark_endpoints.py --database-uri <uri> --skip-build
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+DEFAULT_DATABASE_URI = 'mysql+pymysql://root:@localhost:3306/agri_v'
+
+PROFILES = {
+    # users, crops, sessions, progress, completions, audit_logs
+    'small':  dict(users=1_000, crops=30, sessions=5_000, progress=50_000, completions=25_000, audit_logs=50_000),
+    'medium': dict(users=20_000, crops=100, sessions=100_000, progress=600_000, completions=300_000, audit_logs=500_000),
+    'full':   dict(users=100_000, crops=300, sessions=500_000, progress=3_000_000, completions=1_500_000,
+                   audit_logs=2_000_000),
+}
+
+SOIL_TYPES = ['Sandy Loam', 'Clay Loam', 'Loamy Soil', 'Black Soil', 'Red Soil', 'Alluvial Soil', 'Laterite Soil']
+CATEGORIES = ['Vegetable', 'Cereal', 'Pulse', 'Oilseed', 'Fruit', 'Spice', 'Cash Crop', 'Fiber Crop']
+SEASONS = ['Kharif', 'Rabi', 'Summer', 'Kharif/Rabi', 'Year-round']
+TASK_TYPES = ['fertilizer', 'pesticide', 'irrigation', 'pruning', 'harvesting', 'monitoring', 'maintenance', 'other']
+COMPLETION_TYPES = {'fertilizer', 'pesticide', 'irrigation', 'harvesting'}
+PRIORITIES = ['Low', 'Medium', 'High', 'Critical']
+PROGRESS_STATUSES = ['completed', 'completed', 'completed', 'in_progress', 'not_started', 'skipped']
+AUDIT_ACTIONS = [('user_login', 'user'), ('user_logout', 'user'), ('task_progress_updated', 'task_progress'),
+                 ('task_progress_created', 'task_progress'), ('crop_monitoring_start', 'crop_monitoring'),
+                 ('user_login_attempt', 'user')]
+
+BATCH_ROWS = 2000
+SQLITE_MAX_VARIABLES = 32000
+
+
+# ================= Writers =================
+class BulkWriter:
+    """Write row batches with multi-row INSERT statements or MySQL LOAD DATA LOCAL INFILE."""
+
+    def __init__(self, engine, method='insert'):
+        self.engine = engine
+        self.method = method
+        self.is_sqlite = engine.dialect.name == 'sqlite'
+        self.placeholder = '?' if engine.dialect.paramstyle == 'qmark' else '%s'
+        self.raw = engine.raw_connection()
+        if method == 'load-data' and engine.dialect.name != 'mysql':
+            raise SystemExit("--method load-data requires a MySQL database")
+
+    def __enter__(self):
+        cursor = self.raw.cursor()
+        if self.is_sqlite:
+            cursor.execute('PRAGMA synchronous=OFF')
+            cursor.execute('PRAGMA journal_mode=WAL')
+        else:
+            cursor.execute('SET foreign_key_checks=0')
+            cursor.execute('SET unique_checks=0')
+        cursor.close()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        cursor = self.raw.cursor()
+        if not self.is_sqlite:
+            cursor.execute('SET foreign_key_checks=1')
+            cursor.execute('SET unique_checks=1')
+        cursor.close()
+        self.raw.commit()
+        self.raw.close()
+        return False
+
+    def write(self, table, columns, rows):
+        """Write an iterable of row tuples in batches; returns the number of rows written."""
+        total, batch = 0, []
+        max_rows = BATCH_ROWS
+        if self.is_sqlite:
+            max_rows = max(1, min(BATCH_ROWS, SQLITE_MAX_VARIABLES // len(columns)))
+        started = time.perf_counter()
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= max_rows:
+                total += self._flush(table, columns, batch)
+                batch = []
+                if total % (max_rows * 50) < max_rows:
+                    rate = total / max(time.perf_counter() - started, 1e-9)
+                    print(f"    {table}: {total:,} rows ({rate:,.0f} rows/s)", flush=True)
+        if batch:
+            total += self._flush(table, columns, batch)
+        self.raw.commit()
+        return total
+
+    def _flush(self, table, columns, batch):
+        if self.method == 'load-data':
+            return self._load_data(table, columns, batch)
+        row_sql = '(' + ','.join([self.placeholder] * len(columns)) + ')'
+        sql = f"INSERT INTO {table} ({','.join(columns)}) VALUES " + ','.join([row_sql] * len(batch))
+        cursor = self.raw.cursor()
+        cursor.execute(sql, [value for row in batch for value in row])
+        cursor.close()
+        return len(batch)
+
+    def _load_data(self, table, columns, batch):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='', encoding='utf-8') as fh:
+            writer = csv.writer(fh, quoting=csv.QUOTE_MINIMAL)
+            for row in batch:
+                # An unquoted NULL is read back as SQL NULL when fields are optionally enclosed
+                writer.writerow(['NULL' if v is None else v for v in row])
+            path = fh.name
+        try:
+            cursor = self.raw.cursor()
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                f"LINES TERMINATED BY '\\r\\n' ({','.join(columns)})", (path,))
+            cursor.close()
+        finally:
+            os.unlink(path)
+        return len(batch)
+
+
+def next_id(engine, table, pk='id'):
+    with engine.connect() as conn:
+        return int(conn.execute(text(f"SELECT COALESCE(MAX({pk}), 0) FROM {table}")).scalar() or 0) + 1
+
+
+# ================= Generators =================
+def gen_users(rng, start_id, count):
+    for i in range(start_id, start_id + count):
+        yield (i, f"farmer_{i}", 'password', f"farmer_{i}@scale.local", f"Farmer {i}",
+               f"9{rng.randint(100000000, 999999999)}", 2)
+
+
+def gen_crops(rng, start_id, count):
+    for i in range(start_id, start_id + count):
+        low = round(rng.choice([0.1, 0.25, 0.5, 1.0]), 2)
+        yield (i, f"Synthetic Crop {i}", rng.choice(SEASONS), f"{rng.uniform(0.8, 1.5):.1f} - {rng.uniform(1.6, 3.2):.1f} dS/m",
+               low, round(rng.uniform(10, 500), 2), ','.join(rng.sample(SOIL_TYPES, 3)), rng.choice(CATEGORIES))
+
+
+def plan_crop_tasks(rng, crop_ids, task_start_id, min_weeks, max_weeks, tasks_per_week):
+    """Return ({crop_id: [(task_id, week, title, type)]}, task rows, stage rows) for new crops."""
+    tasks_by_crop, task_rows, stage_rows = {}, [], []
+    task_id = task_start_id
+    for crop_id in crop_ids:
+        weeks = rng.randint(min_weeks, max_weeks)
+        plan = []
+        for week in range(1, weeks + 1):
+            for n in range(rng.randint(max(1, tasks_per_week - 1), tasks_per_week + 1)):
+                task_type = rng.choice(TASK_TYPES)
+                title = f"Week {week} {task_type} task {n + 1}"
+                plan.append((task_id, week, title, task_type))
+                task_rows.append((task_id, crop_id, week, title,
+                                  f"Synthetic {task_type} activity for week {week}.", task_type,
+                                  rng.choice(PRIORITIES), f"{rng.randint(1, 6)} hours",
+                                  "1. Prepare materials\n2. Carry out the task\n3. Record observations",
+                                  "Follow local extension guidance", "Task completed on schedule"))
+                task_id += 1
+        tasks_by_crop[crop_id] = plan
+        bounds = sorted(rng.sample(range(2, weeks), 3)) if weeks > 4 else [1, 2, 3]
+        edges = [1] + bounds + [weeks]
+        for stage in range(4):
+            stage_rows.append((crop_id, stage + 1, f"Stage {stage + 1}", edges[stage], max(edges[stage], edges[stage + 1]),
+                               "Synthetic stage tasks", 'Medium'))
+    return tasks_by_crop, task_rows, stage_rows
+
+
+def existing_crop_tasks(engine):
+    tasks_by_crop = {}
+    with engine.connect() as conn:
+        for task_id, crop_id, week, title, task_type in conn.execute(
+                text("SELECT id, crop_id, week_number, task_title, task_type FROM weekly_tasks")):
+            tasks_by_crop.setdefault(crop_id, []).append((task_id, week, title, task_type))
+        crop_names = dict(conn.execute(text("SELECT id, name FROM crops")).fetchall())
+    return tasks_by_crop, crop_names
+
+
+def gen_sessions(rng, start_id, count, user_ids, crop_choices, now, out_sessions):
+    """Yield session rows; records (session_id, user_id, crop_id, current_week) into out_sessions."""
+    for session_id in range(start_id, start_id + count):
+        crop_id, crop_name, weeks = rng.choice(crop_choices)
+        current_week = rng.randint(1, max(1, weeks))
+        user_id = rng.choice(user_ids)
+        start_date = now - timedelta(weeks=current_week, days=rng.randint(0, 6))
+        out_sessions.append((session_id, user_id, crop_id, current_week))
+        yield (session_id, user_id, crop_id, crop_name, round(rng.uniform(0.2, 25), 2), rng.choice(SOIL_TYPES),
+               start_date, current_week, 'active' if current_week < weeks else 'completed', weeks,
+               start_date, now)
+
+
+def gen_progress(rng, count, sessions, tasks_by_crop, now):
+    """Yield progress rows, at most one per (session_id, task_id) like the real table.
+
+    Each session walks its due tasks in its own fixed shuffled order; `taken` records how far.
+    """
+    taken = {}
+    open_sessions = list(sessions)
+    produced = 0
+    while produced < count and open_sessions:
+        i = rng.randrange(len(open_sessions))
+        session_id, _, crop_id, current_week = open_sessions[i]
+        due = [t for t in tasks_by_crop.get(crop_id, ()) if t[1] <= current_week]
+        start = taken.get(session_id, 0)
+        if start >= len(due):  # every due task of this session already has a row
+            open_sessions[i] = open_sessions[-1]
+            open_sessions.pop()
+            continue
+        random.Random(session_id).shuffle(due)
+        batch = due[start:start + rng.randint(1, 8)]
+        taken[session_id] = start + len(batch)
+        for task_id, week, _, _ in batch:
+            status = rng.choice(PROGRESS_STATUSES)
+            done = now - timedelta(weeks=current_week - week) if status == 'completed' else None
+            yield (session_id, week, task_id, status, done, None, rng.choice([None, 3, 4, 5]), now, now)
+            produced += 1
+            if produced >= count:
+                return
+    print(f"    only {produced:,} distinct (session, task) pairs exist; wrote those")
+
+
+def gen_completions(rng, count, sessions, tasks_by_crop, now):
+    due_by_week = {}  # (crop_id, current_week) -> due tasks, shared by sessions at the same point
+    eligible = []
+    for session_id, _, crop_id, current_week in sessions:
+        key = (crop_id, current_week)
+        if key not in due_by_week:
+            due_by_week[key] = [t for t in tasks_by_crop.get(crop_id, ()) if t[1] <= current_week]
+        if due_by_week[key]:
+            eligible.append((session_id, current_week, due_by_week[key]))
+    if not eligible:
+        print("    no session has a due task; no completions written")
+        return
+    for _ in range(count):
+        session_id, current_week, due = rng.choice(eligible)
+        _, week, title, task_type = rng.choice(due)
+        yield (session_id, task_type if task_type in COMPLETION_TYPES else 'other', title[:200], week,
+               now - timedelta(weeks=current_week - week, hours=rng.randint(0, 72)), None)
+
+
+def gen_audit_logs(rng, count, user_ids, now):
+    for _ in range(count):
+        action, resource_type = rng.choice(AUDIT_ACTIONS)
+        user_id = rng.choice(user_ids)
+        status = 'failure' if action.endswith('_attempt') else 'success'
+        yield (user_id, action, resource_type, rng.randint(1, 100000), json.dumps({"source": "scale"}),
+               f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+               now - timedelta(seconds=rng.randint(0, 86400 * 180)), status)
+
+
+# ================= CLI =================
+def create_tables(database_uri):
+    os.environ['DATABASE_URI'] = database_uri
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as app_module
+    m = app_module
+    models = [m.Crop, m.CropGuide, m.CropStage, m.WeeklyTask, m.User, m.CropMonitoringSession,
+              m.CropProgressTracking, m.TaskCompletion, m.AuditLog]
+    with m.app.app_context():
+        m.db.metadata.create_all(m.db.engine, tables=[model.__table__ for model in models])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic scale data")
+    parser.add_argument('--database-uri', default=os.environ.get('DATABASE_URI', DEFAULT_DATABASE_URI))
+    parser.add_argument('--create-tables', action='store_true', help="Create the model tables first")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='small')
+    for name in ('users', 'crops', 'sessions', 'progress', 'completions', 'audit_logs'):
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name, help=f"Override the profile's {name} count")
+    parser.add_argument('--min-weeks', type=int, default=12)
+    parser.add_argument('--max-weeks', type=int, default=26)
+    parser.add_argument('--tasks-per-week', type=int, default=4)
+    parser.add_argument('--method', choices=['insert', 'load-data'], default='insert')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    counts = dict(PROFILES[args.profile])
+    for key in counts:
+        if getattr(args, key) is not None:
+            counts[key] = getattr(args, key)
+
+    if args.create_tables:
+        create_tables(args.database_uri)
+    connect_args = {'local_infile': True} if args.method == 'load-data' else {}
+    engine = create_engine(args.database_uri, connect_args=connect_args)
+    rng = random.Random(args.seed)
+    now = datetime.now().replace(microsecond=0)
+    started = time.perf_counter()
+    print(f"Generating {counts} into {args.database_uri.split('@')[-1]} ({args.method})")
+
+    user_start = next_id(engine, 'users', 'user_id')
+    crop_start = next_id(engine, 'crops')
+    task_start = next_id(engine, 'weekly_tasks')
+    session_start = next_id(engine, 'crop_monitoring_sessions')
+
+    with BulkWriter(engine, args.method) as writer:
+        print("  users...")
+        writer.write('users', ['user_id', 'username', 'password_hash', 'email', 'full_name', 'phone', 'role_id'],
+                     gen_users(rng, user_start, counts['users']))
+
+        print("  crops, weekly task plans and stages...")
+        crop_rows = list(gen_crops(rng, crop_start, counts['crops']))
+        writer.write('crops', ['id', 'name', 'season', 'ec_range', 'land_size_min', 'land_size_max', 'soil_types',
+                               'crop_category'], crop_rows)
+        new_tasks, task_rows, stage_rows = plan_crop_tasks(rng, [r[0] for r in crop_rows], task_start,
+                                                           args.min_weeks, args.max_weeks, args.tasks_per_week)
+        writer.write('weekly_tasks', ['id', 'crop_id', 'week_number', 'task_title', 'task_description', 'task_type',
+                                      'priority', 'estimated_duration', 'step_by_step_instructions',
+                                      'tips_and_notes', 'expected_outcome'], task_rows)
+        writer.write('crop_stages', ['crop_id', 'stage_number', 'title', 'start_week', 'end_week', 'tasks',
+                                     'difficulty_level'], stage_rows)
+
+        tasks_by_crop, crop_names = existing_crop_tasks(engine)
+        tasks_by_crop.update(new_tasks)
+        crop_choices = [(crop_id, crop_names.get(crop_id, f"Crop {crop_id}"), max(t[1] for t in plan))
+                        for crop_id, plan in tasks_by_crop.items() if plan]
+        with engine.connect() as conn:
+            user_ids = [row[0] for row in conn.execute(text("SELECT user_id FROM users"))]
+        if not crop_choices or not user_ids:
+            raise SystemExit("No crops with weekly tasks or no users to attach sessions to")
+
+        print("  monitoring sessions...")
+        sessions = []
+        writer.write('crop_monitoring_sessions',
+                     ['id', 'user_id', 'crop_id', 'crop_name', 'land_size', 'soil_type', 'start_date',
+                      'current_week', 'status', 'total_weeks', 'created_at', 'updated_at'],
+                     gen_sessions(rng, session_start, counts['sessions'], user_ids, crop_choices, now, sessions))
+
+        print("  crop_progress_tracking...")
+        writer.write('crop_progress_tracking',
+                     ['session_id', 'week_number', 'task_id', 'completion_status', 'completion_date', 'notes',
+                      'rating', 'created_at', 'updated_at'],
+                     gen_progress(rng, counts['progress'], sessions, tasks_by_crop, now))
+
+        print("  task_completions...")
+        writer.write('task_completions', ['session_id', 'task_type', 'task_name', 'week_number', 'completed_at',
+                                          'notes'],
+                     gen_completions(rng, counts['completions'], sessions, tasks_by_crop, now))
+
+        print("  audit_logs...")
+        writer.write('audit_logs', ['user_id', 'action', 'resource_type', 'resource_id', 'details', 'ip_address',
+                                    'timestamp', 'status'],
+                     gen_audit_logs(rng, counts['audit_logs'], user_ids, now))
+
+    print(f"Done in {time.perf_counter() - started:,.1f}s")
+
+
+if __name__ == "__main__":
+    main()
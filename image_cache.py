@@ -0,0 +1,98 @@
+# image_cache.py - Perceptual-hash cache of disease-diagnosis results
+"""
+Results are keyed by a 64-bit difference hash (dHash) of the ingested image. The image
+has already been decoded, orientation-corrected and downscaled by image_ingest, so
+re-encodes, resizes and small crops or exposure changes of the same photo land within a
+few bits of each other. A lookup returns the newest entry in the same scope (endpoint +
+model) whose Hamming distance is at most IMAGE_CACHE_MAX_DISTANCE.
+
+The cache is one shared LRU of at most IMAGE_CACHE_SIZE entries with a per-entry TTL of
+IMAGE_CACHE_TTL seconds. Lookups scan the entries linearly (a popcount per entry), which
+is cheap at these sizes compared to any model call.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+import metrics
+
+IMAGE_CACHE_ENABLED = os.environ.get('IMAGE_CACHE_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'on'}
+IMAGE_CACHE_SIZE = int(os.environ.get('IMAGE_CACHE_SIZE', '1000'))
+IMAGE_CACHE_TTL = int(os.environ.get('IMAGE_CACHE_TTL', str(24 * 3600)))
+IMAGE_CACHE_MAX_DISTANCE = int(os.environ.get('IMAGE_CACHE_MAX_DISTANCE', '6'))
+
+
+def dhash(image, size: int = 8) -> int:
+    """Difference hash: size*size bits, one per horizontally adjacent pixel pair."""
+    small = image.convert('L').resize((size + 1, size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class ImageResultCache:
+    """Thread-safe LRU/TTL cache with nearest-hash lookup within a scope."""
+
+    def __init__(self, max_size=IMAGE_CACHE_SIZE, ttl=IMAGE_CACHE_TTL, max_distance=IMAGE_CACHE_MAX_DISTANCE):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # (scope, hash) -> {"value", "expires"}
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, image_hash: int):
+        """Cached result for this or a near-duplicate image, or None."""
+        if not IMAGE_CACHE_ENABLED:
+            return None
+        now = time.time()
+        best_key, best_distance = None, self.max_distance + 1
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry["expires"] <= now:
+                    del self._entries[key]
+                    continue
+                if key[0] != scope:
+                    continue
+                distance = hamming(key[1], image_hash)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+                    if distance == 0:
+                        break
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                metrics.inc("image_cache_requests_total", scope=scope,
+                            result="hit" if best_distance == 0 else "near_hit")
+                metrics.observe("image_cache_hit_distance", best_distance, buckets=metrics.COUNT_BUCKETS)
+                return self._entries[best_key]["value"]
+        metrics.inc("image_cache_requests_total", scope=scope, result="miss")
+        return None
+
+    def put(self, scope: str, image_hash: int, value) -> None:
+        if not IMAGE_CACHE_ENABLED:
+            return
+        key = (scope, image_hash)
+        with self._lock:
+            self._entries[key] = {"value": value, "expires": time.time() + self.ttl}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            metrics.set_gauge("image_cache_entries", len(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            metrics.set_gauge("image_cache_entries", 0)
+
+
+image_cache = ImageResultCache()
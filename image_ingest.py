@@ -0,0 +1,110 @@
+# image_ingest.py - Shared in-memory decode / downscale stage for the vision endpoints
+"""
+Uploads are read straight from the request stream into memory. Nothing is written to a
+temp file. JPEGs use PIL draft mode, so the decoder does a DCT-domain downscale (1/2,
+1/4 or 1/8) to the smallest size still at least as large as the model needs. A 12 MP
+phone photo is decoded at about 1/16 of the full cost. The EXIF orientation is applied,
+then the image is resized to the model's working resolution. When bytes are needed
+(Ollama, Gemini), it is re-encoded as a compact JPEG without EXIF metadata.
+
+Working resolutions: VISION_MAX_SIDE for the Ollama vision model, GEMINI_MAX_SIDE for
+Gemini. The local CNN asks for the short side its transform resizes to.
+"""
+from io import BytesIO
+import hashlib
+import os
+import time
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+import metrics
+
+IMAGE_MAX_UPLOAD_BYTES = int(os.environ.get('IMAGE_MAX_UPLOAD_BYTES', str(20 * 1024 * 1024)))
+IMAGE_JPEG_QUALITY = int(os.environ.get('IMAGE_JPEG_QUALITY', '85'))
+VISION_MAX_SIDE = int(os.environ.get('VISION_MAX_SIDE', '1024'))
+GEMINI_MAX_SIDE = int(os.environ.get('GEMINI_MAX_SIDE', '1536'))
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF', 'BMP', 'WEBP', 'MPO'}
+
+
+class IngestError(ValueError):
+    """The upload is missing, too large or not a decodable image (answer 400)."""
+
+
+class IngestedImage:
+    def __init__(self, image, digest: str, original_size: tuple, upload_bytes: int):
+        self.image = image
+        self.digest = digest
+        self.original_size = original_size
+        self.upload_bytes = upload_bytes
+        self._jpeg = None
+
+    @property
+    def jpeg(self) -> bytes:
+        """The resized image as a compact JPEG without EXIF metadata (encoded once)."""
+        if self._jpeg is None:
+            self._jpeg = encode_jpeg(self.image)
+        return self._jpeg
+
+
+def read_upload(file_storage) -> bytes:
+    data = file_storage.stream.read(IMAGE_MAX_UPLOAD_BYTES + 1)
+    if not data:
+        raise IngestError("Empty image upload")
+    if len(data) > IMAGE_MAX_UPLOAD_BYTES:
+        raise IngestError(f"Image larger than {IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    return data
+
+
+def decode(data: bytes, max_side: int = None, min_side: int = None):
+    """Decode to an upright RGB image no larger than max_side (long edge).
+
+    min_side only bounds draft decoding, so the short edge stays at least min_side for a
+    later exact resize (e.g. a torchvision transform).
+    """
+    try:
+        img = Image.open(BytesIO(data))
+        if img.format not in ALLOWED_FORMATS:
+            raise IngestError(f"Unsupported image format {img.format}")
+        target = max_side or min_side
+        if target and img.format in ('JPEG', 'MPO'):
+            if max_side:
+                # draft() keeps both edges >= the request; scale it so the long edge lands near max_side
+                scale = max_side / max(img.size)
+                img.draft('RGB', (int(img.size[0] * scale), int(img.size[1] * scale)))
+            else:
+                img.draft('RGB', (min_side, min_side))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('RGB')
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise IngestError("Invalid image file") from e
+    if max_side and max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+    return img
+
+
+def encode_jpeg(image, quality: int = IMAGE_JPEG_QUALITY) -> bytes:
+    buf = BytesIO()
+    image.save(buf, format='JPEG', quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def ingest(file_storage, max_side: int = None, min_side: int = None, endpoint: str = "") -> IngestedImage:
+    """Read, validate and downscale one uploaded image entirely in memory."""
+    return ingest_bytes(read_upload(file_storage), max_side=max_side, min_side=min_side, endpoint=endpoint)
+
+
+def ingest_bytes(data: bytes, max_side: int = None, min_side: int = None, endpoint: str = "") -> IngestedImage:
+    """Validate and downscale image bytes already in memory (e.g. a zip entry)."""
+    start = time.perf_counter()
+    if len(data) > IMAGE_MAX_UPLOAD_BYTES:
+        raise IngestError(f"Image larger than {IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    try:
+        with Image.open(BytesIO(data)) as probe:  # header only; decode() does the real work
+            original_size = probe.size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise IngestError("Invalid image file") from e
+    img = decode(data, max_side=max_side, min_side=min_side)
+    metrics.observe("image_ingest_seconds", time.perf_counter() - start, endpoint=endpoint)
+    metrics.inc("image_ingest_bytes_total", len(data), endpoint=endpoint)
+    return IngestedImage(img, hashlib.sha256(data).hexdigest(), original_size, len(data))
@@ -0,0 +1,195 @@
+# image_jobs.py - Background job queue for slow image analysis (Ollama / Gemini vision)
+"""
+POST /api/image-jobs ingests the upload and enqueues the analysis, then returns a job id
+at once (202). A small pool of IMAGE_JOB_WORKERS threads runs the model calls, so web
+workers are never held for the 5-30 s a vision call takes. Clients poll
+GET /api/image-jobs/<id> (optionally long-polling with ?wait=N) or subscribe to
+/api/image-jobs/<id>/events (SSE).
+
+Job state lives in the image_analysis_jobs table, so any gunicorn worker can answer a
+poll. The in-process queue holds at most IMAGE_JOB_MAX_QUEUE jobs, and each user (or
+anonymous IP) may have IMAGE_JOB_PER_USER jobs queued or running. Finished jobs expire
+after IMAGE_JOB_RESULT_TTL seconds. Jobs still unfinished after IMAGE_JOB_TIMEOUT
+seconds (e.g. lost in a restart) are marked failed.
+"""
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+import metrics
+
+IMAGE_JOB_WORKERS = int(os.environ.get('IMAGE_JOB_WORKERS', '2'))
+IMAGE_JOB_MAX_QUEUE = int(os.environ.get('IMAGE_JOB_MAX_QUEUE', '32'))
+IMAGE_JOB_PER_USER = int(os.environ.get('IMAGE_JOB_PER_USER', '3'))
+IMAGE_JOB_RESULT_TTL = int(os.environ.get('IMAGE_JOB_RESULT_TTL', '900'))
+IMAGE_JOB_TIMEOUT = int(os.environ.get('IMAGE_JOB_TIMEOUT', '300'))
+IMAGE_JOB_MAX_WAIT = float(os.environ.get('IMAGE_JOB_MAX_WAIT', '25'))
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobRejected(Exception):
+    """The job could not be accepted; reason is "queue_full" or "user_limit"."""
+
+    def __init__(self, message: str, reason: str, retry_after: int):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = max(1, int(retry_after))
+
+
+def job_to_dict(job) -> dict:
+    data = {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status in ('done', 'failed'):
+        data["result"] = json.loads(job.result) if job.result else None
+        data["status_code"] = job.status_code
+        data["error"] = job.error
+        data["expires_at"] = job.expires_at.isoformat() if job.expires_at else None
+    return data
+
+
+class ImageJobQueue:
+    def __init__(self, workers=IMAGE_JOB_WORKERS, max_queue=IMAGE_JOB_MAX_QUEUE, per_user=IMAGE_JOB_PER_USER):
+        self.workers = max(1, workers)
+        self.per_user = per_user
+        self.app = None
+        self.db = None
+        self.model = None
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._threads = []
+        self._lock = threading.Lock()
+        self._run_time = 15.0  # EWMA of seconds per job, seeds the Retry-After estimate
+        self._last_purge = 0.0
+
+    def init_app(self, app, db, job_model) -> None:
+        self.app = app
+        self.db = db
+        self.model = job_model
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"image-job-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _estimate_wait(self) -> float:
+        return self._run_time * (self._queue.qsize() + 1) / self.workers
+
+    def purge(self) -> None:
+        """Delete expired results and fail jobs that outlived IMAGE_JOB_TIMEOUT (throttled)."""
+        if time.monotonic() - self._last_purge < 30:
+            return
+        self._last_purge = time.monotonic()
+        now = datetime.now()
+        Job = self.model
+        Job.query.filter(Job.expires_at < now).delete(synchronize_session=False)
+        stale = Job.query.filter(Job.status.in_(ACTIVE_STATUSES),
+                                 Job.created_at < now - timedelta(seconds=IMAGE_JOB_TIMEOUT))
+        stale.update({"status": "failed", "error": "Job timed out", "status_code": 504, "finished_at": now,
+                      "expires_at": now + timedelta(seconds=IMAGE_JOB_RESULT_TTL)}, synchronize_session=False)
+        self.db.session.commit()
+
+    def submit(self, kind: str, owner: str, fn):
+        """Persist and enqueue a job; fn() runs on a worker and returns (payload, status_code)."""
+        self.purge()
+        Job = self.model
+        active = Job.query.filter(Job.owner == owner, Job.status.in_(ACTIVE_STATUSES)).count()
+        if active >= self.per_user:
+            metrics.inc("image_jobs_rejected_total", reason="user_limit")
+            raise JobRejected(f"You already have {active} image analyses in progress", "user_limit",
+                              self._estimate_wait())
+        if self._queue.full():
+            metrics.inc("image_jobs_rejected_total", reason="queue_full")
+            raise JobRejected("Image analysis queue is full", "queue_full", self._estimate_wait())
+
+        job = Job(id=uuid.uuid4().hex, kind=kind, owner=owner, status='queued', created_at=datetime.now())
+        self.db.session.add(job)
+        self.db.session.commit()
+        try:
+            self._queue.put_nowait((job.id, kind, fn, time.monotonic()))
+        except queue.Full:
+            job.status, job.error, job.status_code = 'failed', "Image analysis queue is full", 503
+            job.finished_at = datetime.now()
+            job.expires_at = job.finished_at + timedelta(seconds=IMAGE_JOB_RESULT_TTL)
+            self.db.session.commit()
+            metrics.inc("image_jobs_rejected_total", reason="queue_full")
+            raise JobRejected("Image analysis queue is full", "queue_full", self._estimate_wait())
+        metrics.inc("image_jobs_submitted_total", kind=kind)
+        metrics.set_gauge("image_job_queue_depth", self._queue.qsize())
+        self._ensure_workers()
+        return job
+
+    def get(self, job_id: str, owner: str):
+        job = self.db.session.get(self.model, job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    def wait(self, job_id: str, owner: str, timeout: float):
+        """Long-poll: re-read the job until it finishes or timeout elapses.
+
+        Each read runs in a fresh transaction: under REPEATABLE READ (InnoDB's default) a
+        re-read inside the same one would never see the worker's update. Uncommitted
+        changes in the session are discarded.
+        """
+        deadline = time.monotonic() + min(timeout, IMAGE_JOB_MAX_WAIT)
+        while True:
+            self.db.session.rollback()
+            job = self.get(job_id, owner)
+            if job is None or job.status not in ACTIVE_STATUSES or time.monotonic() >= deadline:
+                return job
+            self.db.session.rollback()  # also returns the connection to the pool while sleeping
+            time.sleep(0.5)
+
+    def _update(self, job_id: str, **fields) -> None:
+        job = self.db.session.get(self.model, job_id)
+        if job is None:
+            return
+        for name, value in fields.items():
+            setattr(job, name, value)
+        self.db.session.commit()
+
+    def _work(self) -> None:
+        while True:
+            job_id, kind, fn, enqueued = self._queue.get()
+            metrics.set_gauge("image_job_queue_depth", self._queue.qsize())
+            metrics.observe("image_job_wait_seconds", time.monotonic() - enqueued, kind=kind)
+            start = time.monotonic()
+            outcome = "failed"
+            with self.app.app_context():
+                try:
+                    self._update(job_id, status='running', started_at=datetime.now())
+                    try:
+                        payload, status_code = fn()
+                        outcome = "done" if status_code < 400 else "failed"
+                        error = payload.get("error") if outcome == "failed" else None
+                    except Exception as e:
+                        logging.error("Image job %s (%s) failed: %s", job_id, kind, e)
+                        payload, status_code, error = None, 500, str(e)
+                    finished = datetime.now()
+                    self._update(job_id, status=outcome, status_code=status_code, error=error,
+                                 result=json.dumps(payload) if payload is not None else None,
+                                 finished_at=finished,
+                                 expires_at=finished + timedelta(seconds=IMAGE_JOB_RESULT_TTL))
+                except Exception as e:
+                    logging.error("Image job %s could not be recorded: %s", job_id, e)
+                    self.db.session.rollback()
+            elapsed = time.monotonic() - start
+            self._run_time = 0.8 * self._run_time + 0.2 * elapsed
+            metrics.observe("image_job_run_seconds", elapsed, kind=kind, outcome=outcome)
+
+
+image_jobs = ImageJobQueue()
@@ -0,0 +1,174 @@
+# llm_queue.py - Bounded dispatch of Ollama calls with in-flight request coalescing
+"""
+At most LLM_MAX_CONCURRENCY generations run against Ollama at once (match this to the
+server's OLLAMA_NUM_PARALLEL). Further callers wait in a FIFO queue of at most
+LLM_MAX_QUEUE entries for up to LLM_QUEUE_TIMEOUT seconds; beyond that they fail fast
+with LLMQueueFull, which carries the queue position and an estimated wait so the API
+can answer 503 with Retry-After instead of tying up a worker thread.
+
+Calls submitted with the same coalescing key while one is already running share that
+single generation (and its result or exception).
+"""
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+
+import metrics
+
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', os.environ.get('OLLAMA_NUM_PARALLEL', '2')))
+LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', '16'))
+LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', '60'))
+
+
+_slot_state = threading.local()
+
+
+def current_queue_wait() -> float:
+    """Seconds the current thread waited for the slot it holds (0 outside a slot)."""
+    return getattr(_slot_state, 'wait', 0.0)
+
+
+class LLMQueueFull(Exception):
+    """Raised when no generation slot is available within the queue limits."""
+
+    def __init__(self, queue_position: int, retry_after: float):
+        super().__init__(f"LLM queue full (position {queue_position})")
+        self.queue_position = queue_position
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+def coalesce_key(*parts) -> str:
+    """Stable key for a generation request built from JSON-serializable parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LLMDispatcher:
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, max_queue=LLM_MAX_QUEUE, wait_timeout=LLM_QUEUE_TIMEOUT):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = deque()
+        self._inflight = {}
+        self._service_time = 10.0  # EWMA of seconds per generation, seeds the wait estimate
+
+    def _estimate_wait(self, position: int) -> float:
+        return self._service_time * position / self.max_concurrency
+
+    def _publish(self) -> None:
+        metrics.set_gauge("llm_queue_active", self._active)
+        metrics.set_gauge("llm_queue_waiting", len(self._waiting))
+
+    def _acquire(self) -> float:
+        """Take a generation slot, waiting in FIFO order; returns seconds spent queued."""
+        with self._cond:
+            if self._active < self.max_concurrency and not self._waiting:
+                self._active += 1
+                self._publish()
+                return 0.0
+            position = len(self._waiting) + 1
+            if position > self.max_queue:
+                metrics.inc("llm_queue_rejected_total", reason="full")
+                raise LLMQueueFull(position, self._estimate_wait(position))
+
+            ticket = object()
+            self._waiting.append(ticket)
+            self._publish()
+            start = time.monotonic()
+            deadline = start + self.wait_timeout
+            try:
+                while not (self._waiting[0] is ticket and self._active < self.max_concurrency):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        position = next(i for i, t in enumerate(self._waiting, 1) if t is ticket)
+                        metrics.inc("llm_queue_rejected_total", reason="timeout")
+                        raise LLMQueueFull(position, self._estimate_wait(position))
+                    self._cond.wait(remaining)
+                self._waiting.popleft()
+                self._active += 1
+            finally:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+                self._publish()
+            return time.monotonic() - start
+
+    def _release(self, elapsed: float) -> None:
+        with self._cond:
+            self._active -= 1
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            self._publish()
+            self._cond.notify_all()
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without queueing, for optional extra work such as hedged requests."""
+        with self._cond:
+            if self._active >= self.max_concurrency or self._waiting:
+                return False
+            self._active += 1
+            self._publish()
+            return True
+
+    def release(self, elapsed: float) -> None:
+        """Give back a slot taken with try_acquire()."""
+        self._release(elapsed)
+
+    @contextmanager
+    def slot(self, model: str = ""):
+        """Hold one generation slot for the duration of the block (e.g. a stream)."""
+        waited = self._acquire()
+        metrics.observe("llm_queue_wait_seconds", waited, model=model)
+        _slot_state.wait = waited
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            _slot_state.wait = 0.0
+            self._release(time.monotonic() - start)
+
+    def run(self, fn, key: str = None, model: str = ""):
+        """Run fn() in a slot; concurrent calls with the same key share one execution."""
+        if key is None:
+            with self.slot(model):
+                return fn()
+
+        with self._cond:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            metrics.inc("llm_coalesced_total", model=model)
+            return future.result()
+
+        try:
+            with self.slot(model):
+                result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._cond:
+                self._inflight.pop(key, None)
+
+    def status(self) -> dict:
+        with self._cond:
+            return {
+                "active": self._active,
+                "waiting": len(self._waiting),
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "estimated_wait_seconds": round(self._estimate_wait(len(self._waiting) + 1), 1),
+            }
+
+
+dispatcher = LLMDispatcher()
@@ -0,0 +1,310 @@
+# llm_router.py - Spread AgriBot chat traffic over several Ollama / OpenAI-compatible backends
+"""
+Backends are listed in LLM_BACKENDS as comma-separated kind=url pairs, for example
+
+    LLM_BACKENDS=ollama=http://127.0.0.1:11434,ollama=http://10.0.0.5:11434,openai=http://127.0.0.1:5001/v1
+
+When unset, the local Ollama (OLLAMA_HOST) is used, plus the text-generation-webui API at
+TEXTGEN_API_BASE / TEXTGEN_API_KEY if TEXTGEN_API_BASE is set in the environment.
+
+Each request goes to the healthy backend with the lowest (in_flight + 1) * EWMA latency.
+A background thread probes every backend every LLM_HEALTH_INTERVAL seconds, and
+LLM_MAX_FAILURES consecutive errors take a backend out until its next successful probe.
+With LLM_HEDGE_AFTER > 0, a non-streaming request still running after that many seconds
+is duplicated to the next-best backend, and the first successful answer wins. The duplicate
+takes its own llm_queue slot, so hedging is skipped when LLM_MAX_CONCURRENCY is exhausted.
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+import metrics
+import ollama_client
+from llm_queue import dispatcher as llm_dispatcher
+from llm_telemetry import response_stats
+
+LLM_HEALTH_INTERVAL = int(os.environ.get('LLM_HEALTH_INTERVAL', '15'))
+LLM_HEALTH_TIMEOUT = float(os.environ.get('LLM_HEALTH_TIMEOUT', '5'))
+LLM_MAX_FAILURES = int(os.environ.get('LLM_MAX_FAILURES', '3'))
+LLM_HEDGE_AFTER = float(os.environ.get('LLM_HEDGE_AFTER', '0'))
+LLM_EWMA_ALPHA = float(os.environ.get('LLM_EWMA_ALPHA', '0.2'))
+TEXTGEN_MODEL = os.environ.get('TEXTGEN_MODEL', '')
+TEXTGEN_TIMEOUT = float(os.environ.get('TEXTGEN_TIMEOUT', '120'))
+
+
+# text, token/duration stats (see llm_telemetry.response_stats) and the backend that answered
+LLMReply = namedtuple('LLMReply', 'text stats backend')
+
+
+class NoHealthyBackend(Exception):
+    pass
+
+
+class Backend:
+    def __init__(self, kind: str, url: str, api_key: str = None):
+        self.kind = kind
+        self.url = url.rstrip('/')
+        self.api_key = api_key
+        self.name = f"{kind}@{self.url}"
+        self.in_flight = 0
+        self.ewma_latency = 1.0
+        self.failures = 0
+        self.healthy = True
+        self.lock = threading.Lock()
+        if kind == 'openai':
+            self.http = requests.Session()
+            if api_key:
+                self.http.headers['Authorization'] = f"Bearer {api_key}"
+
+    # ---- protocol adapters ----
+    def _openai_payload(self, model, messages, options, stream=False):
+        options = options or {}
+        payload = {"model": TEXTGEN_MODEL or model, "messages": messages, "stream": stream}
+        for src, dst in (("temperature", "temperature"), ("top_p", "top_p"),
+                         ("repeat_penalty", "repetition_penalty"), ("num_predict", "max_tokens")):
+            if src in options:
+                payload[dst] = options[src]
+        return payload
+
+    def chat(self, model, messages, options) -> LLMReply:
+        if self.kind == 'ollama':
+            result = ollama_client.chat(model=model, messages=messages, options=options, host=self.url)
+            message = result.get('message') if isinstance(result, dict) else getattr(result, 'message', None)
+            content = message.get('content') if isinstance(message, dict) else getattr(message, 'content', None)
+            return LLMReply((content or '').strip(), response_stats(result), self.name)
+        response = self.http.post(f"{self.url}/chat/completions", json=self._openai_payload(model, messages, options),
+                                  timeout=TEXTGEN_TIMEOUT)
+        response.raise_for_status()
+        body = response.json()
+        choices = body.get('choices') or [{}]
+        return LLMReply(((choices[0].get('message') or {}).get('content') or '').strip(), response_stats(body), self.name)
+
+    def stream_chat(self, model, messages, options, stats=None):
+        """Yield text deltas; token stats from the final chunk are copied into `stats`."""
+        if self.kind == 'ollama':
+            stream = ollama_client.chat(model=model, messages=messages, options=options, stream=True, host=self.url)
+            try:
+                for chunk in stream:
+                    message = chunk.get('message') if isinstance(chunk, dict) else getattr(chunk, 'message', None)
+                    text = message.get('content') if isinstance(message, dict) else getattr(message, 'content', None)
+                    if text:
+                        yield text
+                    if stats is not None:
+                        stats.update(response_stats(chunk))
+            finally:
+                close = getattr(stream, 'close', None)
+                if callable(close):
+                    close()
+            return
+        response = self.http.post(f"{self.url}/chat/completions", stream=True, timeout=TEXTGEN_TIMEOUT,
+                                  json=self._openai_payload(model, messages, options, stream=True))
+        try:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                event = json.loads(data)
+                choices = event.get('choices') or [{}]
+                text = (choices[0].get('delta') or {}).get('content')
+                if text:
+                    yield text
+                if stats is not None:
+                    stats.update(response_stats(event))
+        finally:
+            response.close()
+
+    def probe(self) -> bool:
+        try:
+            # Not through ollama_client: its OLLAMA_TIMEOUT is sized for generation, not a health check
+            if self.kind == 'ollama':
+                requests.get(f"{self.url}/api/tags", timeout=LLM_HEALTH_TIMEOUT).raise_for_status()
+            else:
+                self.http.get(f"{self.url}/models", timeout=LLM_HEALTH_TIMEOUT).raise_for_status()
+            return True
+        except Exception:
+            return False
+
+    # ---- bookkeeping ----
+    def score(self) -> float:
+        return (self.in_flight + 1) * self.ewma_latency
+
+    def begin(self) -> None:
+        with self.lock:
+            self.in_flight += 1
+            metrics.set_gauge("llm_backend_in_flight", self.in_flight, backend=self.name)
+
+    def end(self, elapsed: float, ok: bool) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            metrics.set_gauge("llm_backend_in_flight", self.in_flight, backend=self.name)
+            if ok:
+                self.failures = 0
+                self.ewma_latency = (1 - LLM_EWMA_ALPHA) * self.ewma_latency + LLM_EWMA_ALPHA * elapsed
+            else:
+                self.failures += 1
+                if self.failures >= LLM_MAX_FAILURES and self.healthy:
+                    self.healthy = False
+                    logging.warning("LLM backend %s marked unhealthy after %d failures", self.name, self.failures)
+        metrics.inc("llm_backend_requests_total", backend=self.name, outcome="ok" if ok else "error")
+        metrics.observe("llm_backend_latency_seconds", elapsed, backend=self.name)
+
+
+def _configured_backends() -> list:
+    spec = os.environ.get('LLM_BACKENDS', '').strip()
+    backends = []
+    if spec:
+        for item in spec.split(','):
+            kind, _, url = item.strip().partition('=')
+            if kind in ('ollama', 'openai') and url:
+                backends.append(Backend(kind, url, os.environ.get('TEXTGEN_API_KEY') if kind == 'openai' else None))
+            elif item.strip():
+                logging.warning("Ignoring LLM backend %r (expected ollama=URL or openai=URL)", item)
+    else:
+        backends.append(Backend('ollama', ollama_client.OLLAMA_HOST))
+        if os.environ.get('TEXTGEN_API_BASE'):
+            backends.append(Backend('openai', os.environ['TEXTGEN_API_BASE'], os.environ.get('TEXTGEN_API_KEY')))
+    return backends
+
+
+class LLMRouter:
+    def __init__(self, backends=None):
+        self.backends = backends if backends is not None else _configured_backends()
+        self._pool = ThreadPoolExecutor(max_workers=max(4, 4 * len(self.backends)), thread_name_prefix="llm-router")
+        self._health_started = False
+
+    def ollama_hosts(self) -> list:
+        return [b.url for b in self.backends if b.kind == 'ollama']
+
+    def ranked(self, exclude=()) -> list:
+        candidates = [b for b in self.backends if b not in exclude]
+        # With every backend marked down, still try them rather than failing outright
+        candidates = [b for b in candidates if b.healthy] or candidates
+        if not candidates:
+            raise NoHealthyBackend("No healthy LLM backend available")
+        return sorted(candidates, key=Backend.score)
+
+    def _call(self, backend, model, messages, options) -> LLMReply:
+        backend.begin()
+        start = time.perf_counter()
+        ok = False
+        try:
+            reply = backend.chat(model, messages, options)
+            ok = True
+            return reply
+        finally:
+            backend.end(time.perf_counter() - start, ok)
+
+    def _hedge(self, backend, model, messages, options) -> LLMReply:
+        """_call in the extra dispatcher slot taken for it by chat()."""
+        start = time.monotonic()
+        try:
+            return self._call(backend, model, messages, options)
+        finally:
+            llm_dispatcher.release(time.monotonic() - start)
+
+    def chat(self, model, messages, options=None) -> LLMReply:
+        """Answer from the least-loaded healthy backend, hedging slow calls if enabled.
+
+        When the first backend fails outright (connection refused, 5xx), the next one in the
+        ranking is tried once before the error reaches the caller.
+        """
+        ranked = self.ranked()
+        primary = ranked[0]
+        if LLM_HEDGE_AFTER <= 0 or len(ranked) < 2:
+            try:
+                return self._call(primary, model, messages, options)
+            except Exception as e:
+                if len(ranked) < 2:
+                    raise
+                self._note_failover(primary, ranked[1], e)
+                return self._call(ranked[1], model, messages, options)
+
+        futures = {self._pool.submit(self._call, primary, model, messages, options): primary}
+        done, _ = wait(futures, timeout=LLM_HEDGE_AFTER)
+        backup = ranked[1]
+        if not done:
+            # The caller already holds one slot; the duplicate needs a second or is not sent
+            if llm_dispatcher.try_acquire():
+                metrics.inc("llm_hedged_total", backend=backup.name)
+                futures[self._pool.submit(self._hedge, backup, model, messages, options)] = backup
+            else:
+                metrics.inc("llm_hedge_skipped_total", backend=backup.name)
+        elif next(iter(done)).exception() is not None:
+            self._note_failover(primary, backup, next(iter(done)).exception())
+            futures[self._pool.submit(self._call, backup, model, messages, options)] = backup
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    # The losing request is left to finish in the pool; its answer is discarded
+                    return future.result()
+                except Exception as e:
+                    error = e
+        raise error
+
+    @staticmethod
+    def _note_failover(failed, backup, error) -> None:
+        logging.warning("LLM backend %s failed (%s); retrying on %s", failed.name, error, backup.name)
+        metrics.inc("llm_failover_total", backend=backup.name)
+
+    def stream_chat(self, model, messages, options=None, stats=None):
+        """Yield text deltas from the least-loaded healthy backend (streams are not hedged).
+
+        Token stats and the backend name are written into `stats` when given."""
+        backend = self.ranked()[0]
+        if stats is not None:
+            stats["backend"] = backend.name
+        backend.begin()
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield from backend.stream_chat(model, messages, options, stats)
+            ok = True
+        except GeneratorExit:
+            ok = True
+            raise
+        finally:
+            backend.end(time.perf_counter() - start, ok)
+
+    def check_health(self) -> None:
+        for backend in self.backends:
+            healthy = backend.probe()
+            if healthy != backend.healthy:
+                logging.info("LLM backend %s is now %s", backend.name, "healthy" if healthy else "unhealthy")
+            with backend.lock:
+                backend.healthy = healthy
+                if healthy:
+                    backend.failures = 0
+            metrics.set_gauge("llm_backend_healthy", 1 if healthy else 0, aggregate="last", backend=backend.name)
+
+    def _health_loop(self) -> None:
+        while True:
+            try:
+                self.check_health()
+            except Exception as e:
+                logging.warning("LLM health check failed: %s", e)
+            time.sleep(LLM_HEALTH_INTERVAL)
+
+    def start_health_checks(self) -> None:
+        if self._health_started or LLM_HEALTH_INTERVAL <= 0:
+            return
+        self._health_started = True
+        threading.Thread(target=self._health_loop, name="llm-health", daemon=True).start()
+
+    def status(self) -> list:
+        return [{"backend": b.name, "healthy": b.healthy, "in_flight": b.in_flight,
+                 "ewma_latency_seconds": round(b.ewma_latency, 3)} for b in self.backends]
+
+
+router = LLMRouter()
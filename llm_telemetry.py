@@ -0,0 +1,136 @@
+# llm_telemetry.py - Structured per-call telemetry for LLM / vision model calls
+"""
+Wrap each model call in `with llm_call(model, op, backend) as call:` and hand the raw
+response to call.set_response(). When the block exits, one JSON line is logged on the
+"llm_telemetry" logger:
+
+    {"model": "phi3", "op": "chat", "backend": "ollama", "outcome": "ok", "queue_wait_s": 0.41,
+     "duration_s": 6.2, "load_s": 0.01, "prompt_tokens": 512, "prompt_eval_s": 0.9,
+     "completion_tokens": 180, "eval_s": 5.1, "tokens_per_s": 35.3, "fallback": null, "error": null}
+
+The same values feed per-model histograms (llm_call_duration_seconds,
+llm_call_queue_wait_seconds, llm_prompt_tokens, llm_completion_tokens,
+llm_prompt_eval_seconds, llm_eval_seconds, llm_tokens_per_second) and the counters
+llm_fallback_total{model,path} and llm_errors_total{model,op,error}.
+
+Token counts and durations come from Ollama's prompt_eval_count / eval_count /
+*_duration fields (nanoseconds), from OpenAI-style "usage", or from Gemini usage_metadata.
+"""
+from contextlib import contextmanager
+import json
+import logging
+import time
+
+import metrics
+from llm_queue import current_queue_wait
+
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200)
+
+log = logging.getLogger("llm_telemetry")
+
+
+def _field(obj, name):
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def response_stats(result) -> dict:
+    """Token counts and durations (seconds) from an Ollama, OpenAI-style or Gemini response."""
+    stats = {}
+    if _field(result, 'eval_count') is not None or _field(result, 'prompt_eval_count') is not None:
+        stats["prompt_tokens"] = _field(result, 'prompt_eval_count')
+        stats["completion_tokens"] = _field(result, 'eval_count')
+        for src, dst in (('load_duration', 'load_s'), ('prompt_eval_duration', 'prompt_eval_s'),
+                         ('eval_duration', 'eval_s')):
+            ns = _field(result, src)
+            if ns:
+                stats[dst] = ns / 1e9
+    usage = _field(result, 'usage')
+    if usage:
+        stats["prompt_tokens"] = _field(usage, 'prompt_tokens')
+        stats["completion_tokens"] = _field(usage, 'completion_tokens')
+    usage_metadata = _field(result, 'usage_metadata')
+    if usage_metadata:
+        stats["prompt_tokens"] = _field(usage_metadata, 'prompt_token_count')
+        stats["completion_tokens"] = _field(usage_metadata, 'candidates_token_count')
+    return {k: v for k, v in stats.items() if v is not None}
+
+
+class LLMCall:
+    def __init__(self, model: str, op: str, backend: str):
+        self.model = model
+        self.op = op
+        self.backend = backend
+        self.stats = {}
+        self.fallback = None
+        self.error = None
+
+    def set_response(self, result) -> None:
+        self.stats.update(response_stats(result))
+
+    def set_stats(self, stats: dict) -> None:
+        self.stats.update(stats or {})
+
+    def used_fallback(self, path: str) -> None:
+        self.fallback = path
+        metrics.inc("llm_fallback_total", model=self.model, path=path)
+
+    def failed(self, error: str) -> None:
+        """Mark a non-exception failure (e.g. an empty answer)."""
+        self.error = error
+
+
+def _emit(call: LLMCall, queue_wait: float, duration: float) -> None:
+    outcome = "cancelled" if call.error == "Cancelled" else ("error" if call.error else "ok")
+    labels = {"model": call.model, "op": call.op, "backend": call.backend}
+    metrics.observe("llm_call_duration_seconds", duration, outcome=outcome, **labels)
+    metrics.observe("llm_call_queue_wait_seconds", queue_wait, **labels)
+    stats = call.stats
+    if stats.get("prompt_tokens") is not None:
+        metrics.observe("llm_prompt_tokens", stats["prompt_tokens"], buckets=TOKEN_BUCKETS, **labels)
+    if stats.get("completion_tokens") is not None:
+        metrics.observe("llm_completion_tokens", stats["completion_tokens"], buckets=TOKEN_BUCKETS, **labels)
+    if stats.get("prompt_eval_s") is not None:
+        metrics.observe("llm_prompt_eval_seconds", stats["prompt_eval_s"], **labels)
+    if stats.get("eval_s") is not None:
+        metrics.observe("llm_eval_seconds", stats["eval_s"], **labels)
+
+    # Generation speed: Ollama's own eval time when present, else the wall-clock call time
+    tokens_per_s = None
+    generation_time = stats.get("eval_s") or (duration if stats.get("completion_tokens") else None)
+    if stats.get("completion_tokens") and generation_time:
+        tokens_per_s = stats["completion_tokens"] / generation_time
+        metrics.observe("llm_tokens_per_second", tokens_per_s, buckets=RATE_BUCKETS, **labels)
+    if outcome == "error":
+        metrics.inc("llm_errors_total", model=call.model, op=call.op, error=call.error)
+
+    record = {
+        "model": call.model, "op": call.op, "backend": call.backend, "outcome": outcome,
+        "queue_wait_s": round(queue_wait, 3), "duration_s": round(duration, 3),
+        **{k: (round(v, 3) if isinstance(v, float) else v) for k, v in stats.items()},
+        "tokens_per_s": round(tokens_per_s, 1) if tokens_per_s else None,
+        "fallback": call.fallback, "error": call.error,
+    }
+    log.info(json.dumps(record))
+
+
+@contextmanager
+def llm_call(model: str, op: str, backend: str = "ollama"):
+    """Time one model call and emit its telemetry; exceptions are recorded by class name."""
+    call = LLMCall(model, op, backend)
+    queue_wait = current_queue_wait()
+    start = time.perf_counter()
+    try:
+        yield call
+    except BaseException as e:
+        if isinstance(e, GeneratorExit):
+            call.error = "Cancelled"
+        else:
+            call.error = type(e).__name__
+        raise
+    finally:
+        _emit(call, queue_wait, time.perf_counter() - start)
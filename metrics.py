@@ -0,0 +1,371 @@
+# metrics.py - Lightweight in-process metrics (counters, gauges, histograms) with
+# Prometheus text export and file-based aggregation across gunicorn workers.
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contextlib import contextmanager
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+METRIC_PREFIX = "agri_"
+
+# Seconds; spans fast catalog reads up to slow LLM / vision calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Statements per request
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+# When set (e.g. to a tmpfs path shared by all gunicorn workers), each worker periodically
+# writes its snapshot there and the metrics endpoint merges every worker's file.
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+# Snapshots not rewritten for this long belong to a worker that is gone (or wedged)
+METRICS_STALE_AFTER = float(os.environ.get("METRICS_STALE_AFTER", str(max(30.0, 6 * METRICS_FLUSH_INTERVAL))))
+
+# How a gauge combines across workers: "sum" for additive values (queue depth, in-flight),
+# "max" or "last" (value from the most recent snapshot) for states shared by every worker
+GAUGE_AGGREGATIONS = ("sum", "max", "last")
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_gauges = {}      # (name, labels) -> value
+_histograms = {}  # (name, labels) -> {"buckets": tuple, "counts": list, "sum": float, "count": int}
+_help = {}        # name -> help text
+_gauge_modes = {}  # name -> aggregation across workers (default "sum")
+_last_flush = 0.0
+_flusher_pid = None
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def describe(name: str, help_text: str) -> None:
+    """Attach a HELP line to a metric name."""
+    _help[name] = help_text
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """Increment a counter."""
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def _set_gauge_mode(name: str, aggregate) -> None:
+    if aggregate is not None:
+        if aggregate not in GAUGE_AGGREGATIONS:
+            raise ValueError(f"Unknown gauge aggregation {aggregate!r}")
+        _gauge_modes[name] = aggregate
+
+
+def set_gauge(name: str, value: float, aggregate: str = None, **labels) -> None:
+    """Set a gauge. `aggregate` (sum / max / last) says how workers combine; default sum."""
+    key = (name, _labels_key(labels))
+    with _lock:
+        _set_gauge_mode(name, aggregate)
+        _gauges[key] = value
+
+
+def add_gauge(name: str, delta: float, aggregate: str = None, **labels) -> None:
+    """Adjust a gauge by delta (useful for in-flight / queue depth tracking)."""
+    key = (name, _labels_key(labels))
+    with _lock:
+        _set_gauge_mode(name, aggregate)
+        _gauges[key] = _gauges.get(key, 0) + delta
+
+
+def observe(name: str, value: float, buckets=LATENCY_BUCKETS, **labels) -> None:
+    """Record one observation into a fixed-bucket histogram."""
+    key = (name, _labels_key(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = {"buckets": tuple(buckets), "counts": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0}
+            _histograms[key] = hist
+        idx = len(hist["buckets"])
+        for i, bound in enumerate(hist["buckets"]):
+            if value <= bound:
+                idx = i
+                break
+        hist["counts"][idx] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """Time a block into a latency histogram; failures are labelled outcome="error"."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        observe(name, time.perf_counter() - start, outcome=outcome, **labels)
+
+
+def snapshot() -> dict:
+    """Return this process's metrics as a JSON-serialisable dict."""
+    with _lock:
+        return {
+            "pid": os.getpid(),
+            "written_at": time.time(),
+            "gauge_modes": dict(_gauge_modes),
+            "counters": [[n, list(map(list, l)), v] for (n, l), v in _counters.items()],
+            "gauges": [[n, list(map(list, l)), v] for (n, l), v in _gauges.items()],
+            "histograms": [[n, list(map(list, l)), dict(h, buckets=list(h["buckets"]), counts=list(h["counts"]))]
+                           for (n, l), h in _histograms.items()],
+        }
+
+
+def _snapshot_path(pid=None) -> str:
+    return os.path.join(METRICS_DIR, f"metrics-{pid or os.getpid()}.json")
+
+
+def flush() -> None:
+    """Write this worker's snapshot to METRICS_DIR (atomic rename)."""
+    global _last_flush
+    if not METRICS_DIR:
+        return
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = _snapshot_path()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(snapshot(), fh)
+        os.replace(tmp_path, path)
+        _last_flush = time.monotonic()
+    except Exception as e:
+        logging.warning("Metrics flush failed: %s", e)
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        flush()
+
+
+def maybe_flush() -> None:
+    """Flush if due, and keep a per-process flusher thread running so idle workers stay fresh."""
+    global _flusher_pid
+    if not METRICS_DIR:
+        return
+    if _flusher_pid != os.getpid():  # first call in this (possibly forked) worker
+        _flusher_pid = os.getpid()
+        threading.Thread(target=_flush_loop, daemon=True, name="metrics-flush").start()
+    if time.monotonic() - _last_flush >= METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, TypeError, ValueError):
+        return True  # exists but not ours, or unknown: let the mtime decide
+    return True
+
+
+def _load_snapshots() -> list:
+    """Snapshots of live workers; files of dead or long-silent workers are removed."""
+    snapshots = []
+    now = time.time()
+    for path in glob.glob(os.path.join(METRICS_DIR, "metrics-*.json")):
+        try:
+            pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+            stale = now - os.path.getmtime(path) > METRICS_STALE_AFTER
+            if pid != os.getpid() and (stale or not _pid_alive(pid)):
+                os.remove(path)
+                continue
+            with open(path) as fh:
+                snapshots.append(json.load(fh))
+        except Exception:
+            continue
+    return snapshots
+
+
+def collect() -> dict:
+    """Merge snapshots from every worker (or just this process when METRICS_DIR is unset)."""
+    if not METRICS_DIR:
+        snapshots = [snapshot()]
+    else:
+        flush()
+        snapshots = _load_snapshots()
+    snapshots.sort(key=lambda snap: snap.get("written_at", 0))  # oldest first, so "last" wins
+
+    modes = {}
+    for snap in snapshots:
+        modes.update(snap.get("gauge_modes", {}))
+    counters, gauges, histograms = {}, {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap.get("counters", []):
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snap.get("gauges", []):
+            key = (name, tuple(map(tuple, labels)))
+            mode = modes.get(name, "sum")
+            if key not in gauges or mode == "last":
+                gauges[key] = value
+            elif mode == "max":
+                gauges[key] = max(gauges[key], value)
+            else:
+                gauges[key] += value
+        for name, labels, hist in snap.get("histograms", []):
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.get(key)
+            if merged is None or list(merged["buckets"]) != list(hist["buckets"]):
+                histograms[key] = {"buckets": list(hist["buckets"]), "counts": list(hist["counts"]),
+                                   "sum": hist["sum"], "count": hist["count"]}
+            else:
+                merged["counts"] = [a + b for a, b in zip(merged["counts"], hist["counts"])]
+                merged["sum"] += hist["sum"]
+                merged["count"] += hist["count"]
+    return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+
+def estimate_quantile(hist: dict, q: float) -> float:
+    """Estimate a quantile from bucket counts by linear interpolation within the bucket."""
+    total = hist["count"]
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    lower = 0.0
+    buckets = list(hist["buckets"])
+    for i, count in enumerate(hist["counts"]):
+        upper = buckets[i] if i < len(buckets) else (buckets[-1] if buckets else 0.0)
+        if count and seen + count >= rank:
+            if i >= len(buckets):
+                return upper
+            return lower + (upper - lower) * ((rank - seen) / count)
+        seen += count
+        lower = upper
+    return lower
+
+
+def _format_labels(labels, extra=None) -> str:
+    items = list(labels) + list(extra or [])
+    if not items:
+        return ""
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus(data: dict) -> str:
+    """Render merged metrics in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+
+    def header(name, kind):
+        full = METRIC_PREFIX + name
+        if name in _help:
+            lines.append(f"# HELP {full} {_help[name]}")
+        lines.append(f"# TYPE {full} {kind}")
+        return full
+
+    for kind, store in (("counter", data["counters"]), ("gauge", data["gauges"])):
+        for name in sorted({n for n, _ in store}):
+            full = header(name, kind)
+            for (n, labels), value in sorted(store.items()):
+                if n == name:
+                    lines.append(f"{full}{_format_labels(labels)} {value}")
+
+    hists = data["histograms"]
+    for name in sorted({n for n, _ in hists}):
+        full = header(name, "histogram")
+        series = [(labels, h) for (n, labels), h in sorted(hists.items(), key=lambda kv: kv[0]) if n == name]
+        for labels, h in series:
+            cumulative = 0
+            for bound, count in zip(h["buckets"], h["counts"]):
+                cumulative += count
+                lines.append(f"{full}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{full}_bucket{_format_labels(labels, [('le', '+Inf')])} {h['count']}")
+            lines.append(f"{full}_sum{_format_labels(labels)} {h['sum']}")
+            lines.append(f"{full}_count{_format_labels(labels)} {h['count']}")
+        # Pre-computed p50/p95/p99 estimates for quick inspection without PromQL
+        lines.append(f"# TYPE {full}_quantile gauge")
+        for labels, h in series:
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f"{full}_quantile{_format_labels(labels, [('quantile', q)])} "
+                             f"{round(estimate_quantile(h, q), 6)}")
+    return "\n".join(lines) + "\n"
+
+
+# ================= Flask / SQLAlchemy Instrumentation =================
+# Start times are keyed by cursor: a statement that raises never reaches after_cursor_execute,
+# and _handle_error drops its entry so it cannot be mistaken for a later statement's start
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_query_start", {})[id(cursor)] = time.perf_counter()
+
+
+def _handle_error(exception_context):
+    conn, context = exception_context.connection, exception_context.execution_context
+    cursor = getattr(context, "cursor", None)
+    if conn is not None and cursor is not None:
+        conn.info.get("_metrics_query_start", {}).pop(id(cursor), None)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.get("_metrics_query_start", {}).pop(id(cursor), None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    try:
+        g._metrics_sql_count = getattr(g, "_metrics_sql_count", 0) + 1
+        g._metrics_sql_time = getattr(g, "_metrics_sql_time", 0.0) + elapsed
+    except RuntimeError:
+        # Outside an app/request context (CLI scripts, startup)
+        inc("sql_statements_total", route="<no-request>")
+        inc("sql_time_seconds_total", elapsed, route="<no-request>")
+
+
+def _route_label() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def init_app(app) -> None:
+    """Register per-request latency and SQL statement instrumentation."""
+    describe("http_request_duration_seconds", "Request latency per route")
+    describe("http_requests_total", "Requests per route, method and status")
+    describe("http_request_sql_statements", "SQL statements issued per request")
+    describe("sql_statements_total", "SQL statements per route")
+    describe("sql_time_seconds_total", "Time spent in SQL per route")
+    describe("llm_call_duration_seconds", "Outbound LLM / vision backend call latency")
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+    @app.before_request
+    def _metrics_start_timer():
+        g._metrics_start = time.perf_counter()
+        g._metrics_sql_count = 0
+        g._metrics_sql_time = 0.0
+
+    @app.after_request
+    def _metrics_record_request(response):
+        try:
+            start = getattr(g, "_metrics_start", None)
+            if start is None or request.endpoint == "static":
+                return response
+            route = _route_label()
+            elapsed = time.perf_counter() - start
+            sql_count = getattr(g, "_metrics_sql_count", 0)
+            observe("http_request_duration_seconds", elapsed, route=route, method=request.method)
+            inc("http_requests_total", route=route, method=request.method, status=response.status_code)
+            observe("http_request_sql_statements", sql_count, buckets=COUNT_BUCKETS, route=route)
+            inc("sql_statements_total", sql_count, route=route)
+            inc("sql_time_seconds_total", getattr(g, "_metrics_sql_time", 0.0), route=route)
+            maybe_flush()
+        except Exception as e:
+            logging.debug("Metrics recording failed: %s", e)
+        return response
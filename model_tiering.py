@@ -0,0 +1,71 @@
+# model_tiering.py - Pick the AgriBot model per question: small/fast by default, large when needed
+"""
+Short or factual questions ("what is DAP") go to LLM_SMALL_MODEL; long, multi-part or
+diagnostic ones go to LLM_LARGE_MODEL. The complexity score adds a point for each of:
+the latest question running longer than 20 words (two points past 40), more than one
+question mark, each keyword class matched, and a history longer than four turns. Short
+"what is / define" questions score zero. A score of LLM_TIER_THRESHOLD or more selects the
+large model.
+
+When the LLM queue already has LLM_TIER_DOWNSHIFT_QUEUE or more waiters, every question
+is downshifted to the small model. Each decision and its inputs are logged (logger
+"model_tiering") and counted in llm_tier_decisions_total for tuning.
+"""
+import logging
+import os
+import re
+
+import metrics
+from llm_queue import dispatcher
+
+LLM_SMALL_MODEL = os.environ.get('LLM_SMALL_MODEL', os.environ.get('OLLAMA_MODEL', 'phi3'))
+LLM_LARGE_MODEL = os.environ.get('LLM_LARGE_MODEL', LLM_SMALL_MODEL)
+LLM_TIER_THRESHOLD = int(os.environ.get('LLM_TIER_THRESHOLD', '2'))
+LLM_TIER_DOWNSHIFT_QUEUE = int(os.environ.get('LLM_TIER_DOWNSHIFT_QUEUE', '4'))
+
+KEYWORD_CLASSES = {
+    "diagnosis": re.compile(r"\b(diagnos\w*|symptom\w*|disease\w*|yellow\w*|wilt\w*|spots?|rot\w*|curl\w*|"
+                            r"infest\w*|dying|dried|stunted)\b"),
+    "reasoning": re.compile(r"\b(why|compare|comparison|difference|better|versus|vs|pros|cons|should i|"
+                            r"which is best)\b"),
+    "planning": re.compile(r"\b(plan\w*|schedule|calendar|rotation|intercrop\w*|budget|profit\w*|"
+                           r"step by step|week by week)\b"),
+    "quantitative": re.compile(r"\b(calculat\w*|how much|how many|dose|dosage|per acre|per hectare|ratio|\d+\s*(kg|acre|ha|litre|liter|ml|g)\b)"),
+}
+_FACTUAL = re.compile(r"^\s*(what is|what are|define|meaning of|full form|who is)\b")
+
+log = logging.getLogger("model_tiering")
+
+
+def _latest_question(messages) -> str:
+    for m in reversed(messages or []):
+        if isinstance(m, dict) and m.get('role') == 'user' and isinstance(m.get('content'), str):
+            return m['content']
+    return ""
+
+
+def choose_model(messages) -> str:
+    """Return the model for this conversation and log the decision inputs."""
+    question = _latest_question(messages).lower()
+    words = len(question.split())
+    classes = [name for name, pattern in KEYWORD_CLASSES.items() if pattern.search(question)]
+    turns = sum(1 for m in messages or [] if isinstance(m, dict) and m.get('role') in ('user', 'assistant'))
+    queue_depth = dispatcher.status()["waiting"]
+
+    score = len(classes)
+    score += 2 if words > 40 else (1 if words > 20 else 0)
+    score += 1 if question.count('?') > 1 else 0
+    score += 1 if turns > 4 else 0
+    if _FACTUAL.match(question) and words <= 12:
+        score = 0
+
+    tier = "large" if score >= LLM_TIER_THRESHOLD else "small"
+    reason = "complexity"
+    if tier == "large" and queue_depth >= LLM_TIER_DOWNSHIFT_QUEUE:
+        tier, reason = "small", "queue_pressure"
+    model = LLM_LARGE_MODEL if tier == "large" else LLM_SMALL_MODEL
+
+    log.info("tier=%s model=%s reason=%s score=%d words=%d classes=%s turns=%d queue=%d",
+             tier, model, reason, score, words, ",".join(classes) or "-", turns, queue_depth)
+    metrics.inc("llm_tier_decisions_total", tier=tier, reason=reason)
+    return model
@@ -0,0 +1,116 @@
+# ollama_client.py - Shared Ollama client: pooled connections, timeouts, keep-alive and warm-up
+"""
+All Ollama traffic goes through one ollama.Client per process and host, so HTTP connections
+to each server are pooled and reused, every call has an explicit timeout, and models are pinned in
+memory for OLLAMA_KEEP_ALIVE after each use.
+
+start_warmup() loads every model in OLLAMA_WARMUP_MODELS in the background at startup and
+again every OLLAMA_WARMUP_INTERVAL seconds, so the first farmer after an idle period does
+not pay the model load. Ollama's reported load_duration is recorded as the
+llm_model_load_seconds histogram for every call.
+"""
+import logging
+import os
+import threading
+
+import httpx
+import ollama
+
+import metrics
+
+OLLAMA_HOST = os.environ.get('OLLAMA_HOST', 'http://127.0.0.1:11434')
+OLLAMA_TIMEOUT = float(os.environ.get('OLLAMA_TIMEOUT', '120'))
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get('OLLAMA_CONNECT_TIMEOUT', '5'))
+OLLAMA_MAX_CONNECTIONS = int(os.environ.get('OLLAMA_MAX_CONNECTIONS', '16'))
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
+OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'phi3')
+OLLAMA_VISION_MODEL = os.environ.get('OLLAMA_VISION_MODEL', 'ayansh03/agribot')
+OLLAMA_WARMUP_ENABLED = os.environ.get('OLLAMA_WARMUP_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'on'}
+OLLAMA_WARMUP_MODELS = [m.strip() for m in os.environ.get(
+    'OLLAMA_WARMUP_MODELS', f"{OLLAMA_MODEL},{OLLAMA_VISION_MODEL}").split(',') if m.strip()]
+OLLAMA_WARMUP_INTERVAL = int(os.environ.get('OLLAMA_WARMUP_INTERVAL', '600'))
+
+_clients = {}
+_client_lock = threading.Lock()
+_warmup_started = False
+
+
+def get_client(host: str = None) -> ollama.Client:
+    """The process-wide client for a host (created lazily; its httpx pool is shared by all threads)."""
+    host = host or OLLAMA_HOST
+    client = _clients.get(host)
+    if client is None:
+        with _client_lock:
+            client = _clients.get(host)
+            if client is None:
+                client = _clients[host] = ollama.Client(
+                    host=host,
+                    timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+                    limits=httpx.Limits(max_connections=OLLAMA_MAX_CONNECTIONS,
+                                        max_keepalive_connections=OLLAMA_MAX_CONNECTIONS),
+                )
+    return client
+
+
+def _field(result, name):
+    if isinstance(result, dict):
+        return result.get(name)
+    return getattr(result, name, None)
+
+
+def _record_load(result, model: str) -> None:
+    load_ns = _field(result, 'load_duration')
+    if load_ns:
+        metrics.observe("llm_model_load_seconds", load_ns / 1e9, model=model)
+
+
+def chat(model: str, messages, stream: bool = False, host: str = None, **kwargs):
+    kwargs.setdefault('keep_alive', OLLAMA_KEEP_ALIVE)
+    result = get_client(host).chat(model=model, messages=messages, stream=stream, **kwargs)
+    if not stream:
+        _record_load(result, model)
+    return result
+
+
+def generate(model: str, prompt: str, host: str = None, **kwargs):
+    kwargs.setdefault('keep_alive', OLLAMA_KEEP_ALIVE)
+    result = get_client(host).generate(model=model, prompt=prompt, **kwargs)
+    if not kwargs.get('stream'):
+        _record_load(result, model)
+    return result
+
+
+def embeddings(model: str, prompt: str, **kwargs):
+    kwargs.setdefault('keep_alive', OLLAMA_KEEP_ALIVE)
+    return get_client().embeddings(model=model, prompt=prompt, **kwargs)
+
+
+def warm_model(model: str, host: str = None) -> bool:
+    """Load a model without generating (empty prompt) and pin it for OLLAMA_KEEP_ALIVE."""
+    try:
+        with metrics.timed("llm_warmup_duration_seconds", model=model):
+            generate(model=model, prompt='', host=host)
+        return True
+    except Exception as e:
+        logging.warning("Ollama warm-up for %s on %s failed: %s", model, host or OLLAMA_HOST, e)
+        return False
+
+
+def _warmup_loop(stop: threading.Event, hosts) -> None:
+    while True:
+        for host in hosts:
+            for model in OLLAMA_WARMUP_MODELS:
+                warm_model(model, host)
+        if OLLAMA_WARMUP_INTERVAL <= 0 or stop.wait(OLLAMA_WARMUP_INTERVAL):
+            return
+
+
+def start_warmup(stop: threading.Event = None, hosts=None) -> None:
+    """Warm configured models on each Ollama host in a daemon thread (once per process)."""
+    global _warmup_started
+    if not OLLAMA_WARMUP_ENABLED or _warmup_started or not OLLAMA_WARMUP_MODELS:
+        return
+    _warmup_started = True
+    threading.Thread(target=_warmup_loop, args=(stop or threading.Event(), hosts or [OLLAMA_HOST]),
+                     name="ollama-warmup", daemon=True).start()
+    logging.info("Ollama warm-up scheduled for %s every %ss", ", ".join(OLLAMA_WARMUP_MODELS), OLLAMA_WARMUP_INTERVAL)
@@ -0,0 +1,117 @@
+# query_budget.py - pytest plugin asserting per-request SQL query budgets
+"""
+Counts the SQL statements each Flask test-client request issues (via SQLAlchemy
+`before_cursor_execute` events) and fails the test when a hot endpoint exceeds its
+declared budget, listing the offending statements.
+
+Enable it with `pytest_plugins = ["query_budget"]` in conftest.py (or `-p query_budget`).
+
+Fixtures:
+  query_counter   - context manager recording statements executed while active
+  budgeted_client - Flask test client; every request is checked against QUERY_BUDGETS
+                    by endpoint (override per test with @pytest.mark.query_budget(N))
+  app             - the Flask app from app.py in TESTING mode (override in conftest.py
+                    to point it at a seeded test database)
+"""
+import pytest
+
+# Maximum SQL statements per request, keyed by Flask endpoint (view function name).
+# Keep these tight: a budget that grows with the data is an N+1 coming back.
+QUERY_BUDGETS = {
+    'get_crops': 1,
+    'get_crop_details': 4,             # crop + guide (joined), stages, fertilizers, pesticides
+    'get_crop_details_detailed': 7,
+    'get_weekly_guidance': 8,
+    'get_active_crops': 4,             # sessions, completions, weekly max, stage max
+    'get_progress_notifications': 3,   # session, tasks up to current week, completed ids
+    'get_weekly_progress_summary': 6,
+    'get_crop_suggestions': 2,
+    'get_land_calculations': 2,
+}
+
+
+class QueryCounter:
+    """Record SQL statements executed on any SQLAlchemy engine while active."""
+
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.listen(Engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.remove(Engine, "before_cursor_execute", self._record)
+        return False
+
+
+def format_budget_failure(method, path, endpoint, budget, statements) -> str:
+    lines = [f"{method} {path} ({endpoint}) issued {len(statements)} SQL statements; budget is {budget}:"]
+    for i, statement in enumerate(statements, 1):
+        lines.append(f"  {i:>3}. {' '.join(statement.split())}")
+    return "\n".join(lines)
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget(n): maximum SQL statements allowed per test-client request"
+    )
+
+
+@pytest.fixture
+def query_counter():
+    """Yield a fresh QueryCounter factory: `with query_counter() as qc: ...`."""
+    return QueryCounter
+
+
+@pytest.fixture
+def app():
+    import app as app_module
+    flask_app = app_module.app
+    flask_app.config['TESTING'] = True
+    limiter = getattr(app_module, 'limiter', None)
+    if limiter is not None:
+        limiter.enabled = False
+    return flask_app
+
+
+@pytest.fixture
+def budgeted_client(app, request):
+    """Flask test client that asserts each request stays within its query budget."""
+    from flask.testing import FlaskClient
+
+    marker = request.node.get_closest_marker('query_budget')
+    override = marker.args[0] if marker and marker.args else None
+
+    class BudgetedClient(FlaskClient):
+        def open(self, *args, **kwargs):
+            method = (kwargs.get('method') or 'GET').upper()
+            path = args[0] if args and isinstance(args[0], str) else kwargs.get('path', '/')
+            with QueryCounter() as qc:
+                response = super().open(*args, **kwargs)
+            try:
+                endpoint, _ = app.url_map.bind('localhost').match(path.split('?', 1)[0], method=method)
+            except Exception:
+                endpoint = None
+            budget = override if override is not None else QUERY_BUDGETS.get(endpoint)
+            if budget is not None and qc.count > budget:
+                pytest.fail(format_budget_failure(method, path, endpoint, budget, qc.statements), pytrace=False)
+            return response
+
+    original_class = app.test_client_class
+    app.test_client_class = BudgetedClient
+    try:
+        yield app.test_client()
+    finally:
+        app.test_client_class = original_class
@@ -0,0 +1,55 @@
+# quotas.py - Per-user, cost-weighted request quotas for Flask-Limiter
+from flask import request, session
+from flask_limiter.util import get_remote_address
+import os
+
+# Shared budget (in cost units) every user or anonymous IP gets across all routes
+QUOTA_DAILY_UNITS = int(os.environ.get('QUOTA_DAILY_UNITS', '5000'))
+QUOTA_HOURLY_UNITS = int(os.environ.get('QUOTA_HOURLY_UNITS', '1000'))
+
+# Cost of a request whose endpoint is not listed below
+DEFAULT_ROUTE_COST = 1
+
+# Cost weights keyed by Flask endpoint (view function name).
+# Catalog reads cost 1 unit; LLM and vision calls cost far more.
+ROUTE_COSTS = {
+    'chatbot': 25,
+    'chatbot_analyze_image': 60,
+    'detect_disease_gemini': 60,
+    'submit_image_job': 60,
+    'detect_disease': 10,
+    'scouting_upload': 100,
+    'get_crop_suggestions': 3,
+    'get_land_calculations': 3,
+    'get_weather': 2,
+    'register': 5,
+    'login': 2,
+}
+
+# Endpoints that never draw from the budget (static assets, health pings)
+EXEMPT_ENDPOINTS = {'static', 'favicon', 'serve_index'}
+
+
+def quota_limits():
+    """Return the shared application-wide limits, expressed in cost units."""
+    return [f"{QUOTA_DAILY_UNITS} per day", f"{QUOTA_HOURLY_UNITS} per hour"]
+
+
+def quota_key() -> str:
+    """Key quotas by logged-in user, falling back to the client IP for anonymous traffic."""
+    user_id = session.get('user_id')
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{get_remote_address()}"
+
+
+def request_cost() -> int:
+    """Cost weight of the current request's endpoint."""
+    return ROUTE_COSTS.get(request.endpoint or '', DEFAULT_ROUTE_COST)
+
+
+def is_quota_exempt() -> bool:
+    """Skip quota accounting for CORS preflights and static assets."""
+    if request.method == 'OPTIONS':
+        return True
+    return (request.endpoint or '') in EXEMPT_ENDPOINTS
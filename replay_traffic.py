@@ -0,0 +1,247 @@
+"""
+Replay captured traffic (see traffic_capture.py) against a local instance.
+
+Requests are re-issued on the recorded schedule divided by --speedup (0 = as fast as
+possible) using --concurrency worker threads. Bodies are rebuilt from their recorded
+shape (free text becomes filler of the same length; allow-listed values are reused),
+uploads become generated JPEGs of similar size, and each anonymized client is mapped
+onto one of the --login accounts so authenticated routes work. Paths are rebuilt from
+the route template: hashed ids (session, user, job) become synthetic ids, the same
+recorded id always mapping to the same one. Integer ids fall in 1..--id-range unless
+--id NAME=V1,V2 supplies real ids from the target database.
+
+Usage:
+    python replay_traffic.py captured_traffic.jsonl --base-url http://127.0.0.1:5050 --speedup 10 --concurrency 16
+    python replay_traffic.py captured_traffic.jsonl --speedup 0 --login bench_user_0:bench-password --output replay.json
+    python replay_traffic.py captured_traffic.jsonl --id session_id=12,13,14 --id-range 50
+"""
+import argparse
+import io
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROUTE_VARIABLE = re.compile(r'<(?:(?P<converter>[^:<>]+):)?(?P<name>[^<>]+)>')
+FILLER_WORDS = ("when should i apply urea for paddy how to control leaf spot on tomato "
+                "best irrigation schedule for groundnut in sandy loam soil").split()
+
+
+def load_records(path, limit=None, routes=None):
+    records = []
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if not record.get('route') and not record.get('path'):
+                continue
+            if routes and record.get('route') not in routes:
+                continue
+            records.append(record)
+            if limit and len(records) >= limit:
+                break
+    records.sort(key=lambda r: r.get('ts', 0))
+    return records
+
+
+def filler_text(length: int) -> str:
+    words, size, i = [], 0, 0
+    while size < length:
+        word = FILLER_WORDS[i % len(FILLER_WORDS)]
+        words.append(word)
+        size += len(word) + 1
+        i += 1
+    return ' '.join(words)[:max(length, 1)]
+
+
+def rebuild(shape):
+    """Turn a recorded body shape back into a concrete JSON value."""
+    if isinstance(shape, dict):
+        if '__value__' in shape:
+            return shape['__value__']
+        kind = shape.get('__type__')
+        if kind is None:
+            return {k: rebuild(v) for k, v in shape.items()}
+        if kind == 'str':
+            return filler_text(shape.get('__len__', 8))
+        if kind == 'list':
+            return [rebuild(item) for item in shape.get('__items__') or []]
+        if kind in ('int', 'float'):
+            return 1
+        if kind == 'bool':
+            return False
+        return None
+    return shape
+
+
+def fill_route(route, view_args, id_pools=None, id_range=100):
+    """Concrete path for a route template such as /api/progress/notifications/<int:session_id>."""
+    view_args = view_args or {}
+    id_pools = id_pools or {}
+
+    def substitute(match):
+        name, converter = match.group('name'), match.group('converter') or 'string'
+        value = view_args.get(name)
+        if value is not None and not isinstance(value, dict):
+            return str(value)  # allow-listed catalog value, recorded verbatim
+        token = (value or {}).get('__id__') or '0'
+        digest = int(token, 16) if re.fullmatch(r'[0-9a-f]+', token) else sum(map(ord, token))
+        if id_pools.get(name):
+            return str(id_pools[name][digest % len(id_pools[name])])
+        if converter in ('int', 'float') or (value or {}).get('__type__') in ('int', 'float'):
+            return str(1 + digest % max(1, id_range))
+        return f"replay{token}"
+
+    return ROUTE_VARIABLE.sub(substitute, route)
+
+
+_jpeg_cache = {}
+
+
+def synthetic_jpeg(size_bytes: int) -> bytes:
+    """A JPEG roughly the size of the recorded upload (cached per size bucket)."""
+    bucket = max(1, size_bytes // 50_000)
+    if bucket not in _jpeg_cache:
+        from PIL import Image
+        side = min(4000, max(64, int((bucket * 50_000 / 0.3) ** 0.5)))
+        image = Image.effect_noise((side, side), 64).convert('RGB')
+        buf = io.BytesIO()
+        image.save(buf, format='JPEG', quality=85)
+        _jpeg_cache[bucket] = buf.getvalue()
+    return _jpeg_cache[bucket]
+
+
+class Replayer:
+    def __init__(self, base_url, accounts, timeout, id_pools=None, id_range=100):
+        self.base_url = base_url.rstrip('/')
+        self.accounts = accounts
+        self.timeout = timeout
+        self.id_pools = id_pools or {}
+        self.id_range = id_range
+        self.local = threading.local()
+        self.client_accounts = {}
+        self.lock = threading.Lock()
+        self.results = {}
+
+    def _session_for(self, client, needs_auth):
+        sessions = getattr(self.local, 'sessions', None)
+        if sessions is None:
+            sessions = self.local.sessions = {}
+        key = client if needs_auth and self.accounts else '__anonymous__'
+        if key not in sessions:
+            http = requests.Session()
+            if key != '__anonymous__':
+                with self.lock:
+                    index = self.client_accounts.setdefault(client, len(self.client_accounts) % len(self.accounts))
+                username, password = self.accounts[index]
+                http.post(f"{self.base_url}/api/login", json={"username": username, "password": password},
+                          timeout=self.timeout)
+            sessions[key] = http
+        return sessions[key]
+
+    def send(self, record):
+        http = self._session_for(record.get('client'), record.get('auth'))
+        params = {k: (v if not isinstance(v, dict) else filler_text(v.get('__len__', 4)))
+                  for k, v in (record.get('args') or {}).items()}
+        files = {f['field']: (f"{f['field']}.jpg", synthetic_jpeg(f.get('bytes', 0)), 'image/jpeg')
+                 for f in record.get('files') or []}
+        body = rebuild(record.get('body'))
+        # Captures made before paths were dropped still carry the concrete path
+        path = record.get('path') or fill_route(record['route'], record.get('view_args'), self.id_pools, self.id_range)
+        start = time.perf_counter()
+        try:
+            if files:
+                response = http.request(record['method'], self.base_url + path, params=params,
+                                        files=files, timeout=self.timeout)
+            else:
+                response = http.request(record['method'], self.base_url + path, params=params,
+                                        json=body, timeout=self.timeout)
+            status = response.status_code
+        except Exception:
+            status = 0
+        elapsed = time.perf_counter() - start
+        route = record.get('route') or path
+        with self.lock:
+            stats = self.results.setdefault(route, {"latencies": [], "errors": 0, "recorded_ms": []})
+            stats["latencies"].append(elapsed)
+            stats["recorded_ms"].append(record.get('duration_ms', 0))
+            if status == 0 or status >= 500:
+                stats["errors"] += 1
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured API traffic")
+    parser.add_argument('input', help="JSONL file written by traffic_capture.py")
+    parser.add_argument('--base-url', default='http://127.0.0.1:5050')
+    parser.add_argument('--speedup', type=float, default=1.0, help="Time compression factor; 0 = no pacing")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--login', action='append', default=[], metavar='USER:PASSWORD',
+                        help="Account used for authenticated requests (repeatable)")
+    parser.add_argument('--route', action='append', help="Only replay this route rule (repeatable)")
+    parser.add_argument('--limit', type=int, help="Replay at most this many records")
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--id', action='append', default=[], metavar='NAME=V1,V2',
+                        help="Real values for a route variable such as session_id (repeatable)")
+    parser.add_argument('--id-range', type=int, default=100,
+                        help="Synthetic integer ids fall in 1..N for variables without --id")
+    parser.add_argument('--output', help="Write per-route summary JSON here")
+    args = parser.parse_args()
+
+    records = load_records(args.input, args.limit, set(args.route) if args.route else None)
+    if not records:
+        sys.exit("No records to replay")
+    accounts = [tuple(item.split(':', 1)) for item in args.login if ':' in item]
+    id_pools = {name: [v for v in values.split(',') if v]
+                for name, _, values in (item.partition('=') for item in args.id)}
+    replayer = Replayer(args.base_url, accounts, args.timeout, id_pools, args.id_range)
+    span = records[-1]['ts'] - records[0]['ts']
+    print(f"Replaying {len(records)} requests spanning {span:.0f}s at {args.speedup or 'max'}x "
+          f"with {args.concurrency} workers against {args.base_url}")
+
+    started = time.perf_counter()
+    first_ts = records[0]['ts']
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for record in records:
+            if args.speedup > 0:
+                due = (record['ts'] - first_ts) / args.speedup
+                delay = due - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(replayer.send, record)
+    wall = time.perf_counter() - started
+
+    summary = {}
+    print(f"\n{'route':<50} {'count':>6} {'p50 ms':>9} {'p99 ms':>9} {'rec p50':>9} {'errors':>7}")
+    for route, stats in sorted(replayer.results.items(), key=lambda kv: -len(kv[1]["latencies"])):
+        row = {
+            "count": len(stats["latencies"]),
+            "errors": stats["errors"],
+            "p50_ms": round(_pct(stats["latencies"], 0.50) * 1000, 2),
+            "p99_ms": round(_pct(stats["latencies"], 0.99) * 1000, 2),
+            "recorded_p50_ms": round(_pct(stats["recorded_ms"], 0.50), 2),
+        }
+        summary[route] = row
+        print(f"{route[:50]:<50} {row['count']:>6} {row['p50_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+              f"{row['recorded_p50_ms']:>9.1f} {row['errors']:>7}")
+    total = sum(r["count"] for r in summary.values())
+    print(f"\n{total} requests in {wall:.1f}s ({total / wall if wall else 0:.1f} req/s)")
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({"wall_seconds": round(wall, 2), "routes": summary}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# scouting_upload.py - Bulk field-scouting uploads: streamed zip reading and inference fan-out
+"""
+POST /api/scouting/upload accepts either a multipart batch (any number of image parts, or a
+zip part) or a raw application/zip body. Zip archives are read sequentially from their
+local file headers, one entry at a time. A raw zip body is read straight off the request
+stream and is never buffered whole or spooled to disk. Multipart parts are spooled by
+Werkzeug as usual, so prefer a zip body for very large batches. Only a bounded number of
+decoded images is held in memory at once.
+
+Each image is handed to a shared pool of SCOUTING_WORKERS threads. At most
+SCOUTING_MAX_INFLIGHT images per request are in flight, and results are yielded as they
+complete, so the endpoint can stream NDJSON lines back while the upload is still being
+read. The CNN predictions from the pool are coalesced by disease_batcher into batched
+forward passes.
+"""
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import os
+import struct
+import zlib
+
+SCOUTING_WORKERS = int(os.environ.get('SCOUTING_WORKERS', '4'))
+SCOUTING_MAX_INFLIGHT = int(os.environ.get('SCOUTING_MAX_INFLIGHT', '16'))
+SCOUTING_MAX_IMAGES = int(os.environ.get('SCOUTING_MAX_IMAGES', '500'))
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp', '.gif'}
+ZIP_CONTENT_TYPES = {'application/zip', 'application/x-zip-compressed'}
+
+_LOCAL_HEADER = b'PK\x03\x04'
+_DESCRIPTOR = b'PK\x07\x08'
+_CHUNK = 64 * 1024
+
+_pool = ThreadPoolExecutor(max_workers=max(1, SCOUTING_WORKERS), thread_name_prefix="scouting")
+
+
+class ZipStreamError(ValueError):
+    """The archive cannot be read as a stream (truncated, encrypted, unsupported entry)."""
+
+
+class _StreamReader:
+    """Forward-only reader with push-back, over a file-like object."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._buffer = b''
+
+    def read(self, size: int) -> bytes:
+        if self._buffer:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+            return data
+        return self.stream.read(size)
+
+    def read_exact(self, size: int) -> bytes:
+        parts, remaining = [], size
+        while remaining:
+            data = self.read(remaining)
+            if not data:
+                raise ZipStreamError("Archive is truncated")
+            parts.append(data)
+            remaining -= len(data)
+        return b''.join(parts)
+
+    def unread(self, data: bytes) -> None:
+        self._buffer = data + self._buffer
+
+
+def is_image_name(name: str) -> bool:
+    base = os.path.basename(name)
+    return (not base.startswith('.') and '__MACOSX/' not in name
+            and os.path.splitext(base)[1].lower() in IMAGE_EXTENSIONS)
+
+
+def iter_zip_stream(stream, max_entry_bytes: int):
+    """Yield (name, data) for each file entry, reading local headers in order (no seeking).
+
+    Stored and deflated entries are supported. Deflate streams end themselves, so entries
+    written with a trailing data descriptor (streaming zip writers, phones) work too.
+    """
+    reader = _StreamReader(stream)
+    while True:
+        signature = reader.read(4)
+        if len(signature) < 4 or signature != _LOCAL_HEADER:
+            return  # central directory (or end of body): no more entries
+        (_, flags, method, _, _, crc, compressed_size, _, name_len,
+         extra_len) = struct.unpack('<HHHHHIIIHH', reader.read_exact(26))
+        raw_name = reader.read_exact(name_len)
+        name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437', errors='replace')
+        reader.read_exact(extra_len)
+        if flags & 0x1:
+            raise ZipStreamError(f"{name}: encrypted entries are not supported")
+        has_descriptor = bool(flags & 0x8)
+
+        if method == 0:
+            if has_descriptor or compressed_size == 0xFFFFFFFF:
+                raise ZipStreamError(f"{name}: stored entry without a size cannot be streamed")
+            if compressed_size > max_entry_bytes:
+                raise ZipStreamError(f"{name} is larger than {max_entry_bytes // (1024 * 1024)} MB")
+            data = reader.read_exact(compressed_size)
+        elif method == 8:
+            inflater = zlib.decompressobj(-15)
+            parts, total = [], 0
+            while not inflater.eof:
+                chunk = inflater.unconsumed_tail or reader.read(_CHUNK)
+                if not chunk:
+                    raise ZipStreamError("Archive is truncated")
+                out = inflater.decompress(chunk, max_entry_bytes + 1 - total)
+                total += len(out)
+                if total > max_entry_bytes:
+                    raise ZipStreamError(f"{name} is larger than {max_entry_bytes // (1024 * 1024)} MB")
+                parts.append(out)
+            reader.unread(inflater.unused_data)
+            data = b''.join(parts)
+        else:
+            raise ZipStreamError(f"{name}: compression method {method} is not supported")
+
+        if has_descriptor:
+            head = reader.read_exact(4)
+            if head == _DESCRIPTOR:
+                head = reader.read_exact(4)
+            crc = struct.unpack('<I', head)[0]
+            reader.read_exact(8)  # compressed and uncompressed sizes
+        if zlib.crc32(data) & 0xFFFFFFFF != crc:
+            raise ZipStreamError(f"{name}: CRC mismatch")
+        if not name.endswith('/'):
+            yield name, data
+
+
+def iter_request_images(req, max_entry_bytes: int, max_images: int = SCOUTING_MAX_IMAGES, stats: dict = None):
+    """Yield (name, data) for every image in a raw zip body or a multipart batch.
+
+    Non-image entries are skipped (counted in stats["skipped"]); more than max_images
+    images raises ValueError.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("skipped", 0)
+
+    def entries():
+        if req.mimetype in ZIP_CONTENT_TYPES:
+            yield from iter_zip_stream(req.stream, max_entry_bytes)
+            return
+        for _, storage in req.files.items(multi=True):
+            if storage.filename.lower().endswith('.zip') or storage.mimetype in ZIP_CONTENT_TYPES:
+                yield from iter_zip_stream(storage.stream, max_entry_bytes)
+            else:
+                # Oversized parts are passed on and rejected per image by image_ingest
+                yield storage.filename, storage.stream.read(max_entry_bytes + 1)
+
+    count = 0
+    for name, data in entries():
+        if not is_image_name(name):
+            stats["skipped"] += 1
+            continue
+        count += 1
+        if count > max_images:
+            raise ValueError(f"More than {max_images} images in one upload")
+        yield name, data
+
+
+def fan_out(items, fn, max_inflight: int = SCOUTING_MAX_INFLIGHT):
+    """Submit fn(name, data) for each (name, data) and yield (index, name, future) as they finish.
+
+    Completed results are yielded while items are still being read; reading pauses while
+    max_inflight images are pending. Exceptions raised by `items` propagate after the
+    images already submitted have been yielded.
+    """
+    pending = {}
+    error = None
+    try:
+        try:
+            for index, (name, data) in enumerate(items):
+                pending[_pool.submit(fn, name, data)] = (index, name)
+                if len(pending) >= max_inflight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                else:
+                    done = [f for f in pending if f.done()]
+                for future in done:
+                    yield (*pending.pop(future), future)
+        except (ValueError, OSError) as e:  # bad archive or aborted upload: report after draining
+            error = e
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield (*pending.pop(future), future)
+    except GeneratorExit:
+        for future in pending:  # client went away: drop work that has not started
+            future.cancel()
+        raise
+    if error is not None:
+        raise error
@@ -0,0 +1,67 @@
+"""FaqStore answers are scoped per crop: the same question can have a different answer for each crop."""
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+import pytest
+
+from faq_store import FAQ_PROMPT_VERSION, FaqStore, question_key
+from generate_faq_answers import crop_question
+
+RICE, WHEAT = 1, 2
+QUESTION = "When should I irrigate?"
+
+
+@pytest.fixture
+def store():
+    flask_app = Flask(__name__)
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db = SQLAlchemy(flask_app)
+
+    class CropFaq(db.Model):
+        __tablename__ = 'crop_faqs'
+        id = db.Column(db.Integer, primary_key=True)
+        crop_id = db.Column(db.Integer, nullable=True)
+        question = db.Column(db.Text, nullable=False)
+        question_key = db.Column(db.String(64), nullable=False, index=True)
+        answer = db.Column(db.Text)
+        model = db.Column(db.String(100))
+        prompt_version = db.Column(db.String(50))
+        __table_args__ = (db.UniqueConstraint('crop_id', 'question_key', name='uq_crop_faqs_crop_question'),)
+
+    with flask_app.app_context():
+        db.create_all()
+        key = question_key(QUESTION)
+        db.session.add_all([
+            CropFaq(crop_id=RICE, question=QUESTION, question_key=key, answer="Keep 5 cm of standing water.",
+                    prompt_version=FAQ_PROMPT_VERSION),
+            CropFaq(crop_id=WHEAT, question="when should i irrigate", question_key=key,
+                    answer="Irrigate at crown root initiation.", prompt_version=FAQ_PROMPT_VERSION),
+        ])
+        db.session.commit()
+        faq = FaqStore()
+        faq.init_app(flask_app, CropFaq)
+        yield faq, db, CropFaq
+
+
+def test_same_question_is_answered_per_crop(store):
+    faq, _, _ = store
+    assert faq.lookup(QUESTION, RICE) == "Keep 5 cm of standing water."
+    assert faq.lookup("When should I irrigate", WHEAT) == "Irrigate at crown root initiation."
+
+
+def test_crop_answers_are_not_served_without_that_crop(store):
+    faq, db, CropFaq = store
+    assert faq.lookup(QUESTION) is None
+    assert faq.lookup(QUESTION, 3) is None
+
+    db.session.add(CropFaq(crop_id=None, question=QUESTION, question_key=question_key(QUESTION),
+                           answer="Water when the top soil is dry.", prompt_version=FAQ_PROMPT_VERSION))
+    db.session.commit()
+    faq.invalidate()
+    assert faq.lookup(QUESTION) == "Water when the top soil is dry."
+    assert faq.lookup(QUESTION, RICE) == "Keep 5 cm of standing water."
+
+
+def test_generation_prompt_names_the_crop():
+    assert "Rice" in crop_question(QUESTION, "Rice")
+    assert crop_question(QUESTION, "Rice") != crop_question(QUESTION, "Wheat")
+    assert crop_question(QUESTION) == QUESTION
@@ -0,0 +1,144 @@
+"""gemini_client deadlines, retries and circuit breaker against the local fake_gemini_server."""
+import json
+import time
+import urllib.request
+
+import pytest
+from google.api_core import exceptions as api_exceptions
+
+import fake_gemini_server
+import gemini_client
+from gemini_client import CircuitBreaker, GeminiClient, GeminiUnavailable
+
+MAX_RETRIES = 2
+BREAKER_THRESHOLD = 2
+BREAKER_COOLDOWN = 1.0
+
+
+@pytest.fixture(scope="module")
+def fake_gemini():
+    server, state = fake_gemini_server.serve(port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}", state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(fake_gemini, monkeypatch):
+    endpoint, _ = fake_gemini
+    monkeypatch.setattr(gemini_client, "GEMINI_TIMEOUT", 0.5)
+    monkeypatch.setattr(gemini_client, "GEMINI_MAX_RETRIES", MAX_RETRIES)
+    monkeypatch.setattr(gemini_client, "GEMINI_RETRY_BASE", 0.01)
+    gemini = GeminiClient(model_name="gemini-test", api_key="test-key", endpoint=endpoint)
+    gemini.breaker = CircuitBreaker("gemini:test", threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN)
+    return gemini
+
+
+def set_mode(fake_gemini, mode, **options):
+    _, state = fake_gemini
+    state.set_mode(mode, options.get("delay"), options.get("fail_count"))
+
+
+def server_calls(fake_gemini) -> int:
+    endpoint, _ = fake_gemini
+    with urllib.request.urlopen(f"{endpoint}/_stats", timeout=5) as response:
+        return json.load(response)["calls"]
+
+
+def generate(client, deadline=5.0):
+    return client.generate("Diagnose this leaf", deadline=deadline)
+
+
+def test_ok_returns_answer_in_one_call(client, fake_gemini):
+    set_mode(fake_gemini, "ok")
+    response = generate(client)
+    assert "Early blight" in response.text
+    assert server_calls(fake_gemini) == 1
+    assert client.breaker.state == "closed"
+    assert client.breaker.failures == 0
+
+
+def test_flaky_succeeds_after_retries(client, fake_gemini):
+    set_mode(fake_gemini, "flaky", fail_count=MAX_RETRIES)
+    response = generate(client)
+    assert "Tomato" in response.text
+    assert server_calls(fake_gemini) == MAX_RETRIES + 1
+    assert client.breaker.state == "closed"
+    assert client.breaker.failures == 0
+
+
+def test_error_exhausts_retries_then_opens_breaker(client, fake_gemini):
+    set_mode(fake_gemini, "error")
+    with pytest.raises(GeminiUnavailable) as first:
+        generate(client)
+    assert server_calls(fake_gemini) == MAX_RETRIES + 1
+    assert client.breaker.state == "closed"
+    assert client.breaker.failures == 1
+    assert first.value.retry_after == 1
+    assert isinstance(first.value.__cause__, api_exceptions.ServiceUnavailable)
+
+    with pytest.raises(GeminiUnavailable) as second:
+        generate(client)
+    assert server_calls(fake_gemini) == 2 * (MAX_RETRIES + 1)
+    assert client.breaker.state == "open"
+    assert second.value.retry_after == 1
+
+    # Open: fails fast without reaching the server
+    start = time.monotonic()
+    with pytest.raises(GeminiUnavailable, match="circuit open") as short_circuit:
+        generate(client)
+    assert time.monotonic() - start < 0.1
+    assert server_calls(fake_gemini) == 2 * (MAX_RETRIES + 1)
+    assert short_circuit.value.retry_after == 1
+
+
+def test_half_open_probe_closes_breaker(client, fake_gemini):
+    set_mode(fake_gemini, "error")
+    for _ in range(BREAKER_THRESHOLD):
+        with pytest.raises(GeminiUnavailable):
+            generate(client)
+    assert client.breaker.state == "open"
+
+    set_mode(fake_gemini, "ok")
+    time.sleep(BREAKER_COOLDOWN + 0.1)
+    response = generate(client)
+    assert "Tomato" in response.text
+    assert server_calls(fake_gemini) == 1
+    assert client.breaker.state == "closed"
+    assert client.breaker.failures == 0
+
+
+def test_half_open_probe_failure_reopens_breaker(client, fake_gemini):
+    set_mode(fake_gemini, "error")
+    for _ in range(BREAKER_THRESHOLD):
+        with pytest.raises(GeminiUnavailable):
+            generate(client)
+
+    time.sleep(BREAKER_COOLDOWN + 0.1)
+    set_mode(fake_gemini, "error")
+    with pytest.raises(GeminiUnavailable):
+        generate(client)
+    assert server_calls(fake_gemini) == MAX_RETRIES + 1
+    assert client.breaker.state == "open"
+
+
+def test_bad_request_is_not_retried_and_keeps_breaker_closed(client, fake_gemini):
+    set_mode(fake_gemini, "bad")
+    with pytest.raises(api_exceptions.BadRequest):
+        generate(client)
+    assert server_calls(fake_gemini) == 1
+    assert client.breaker.state == "closed"
+    assert client.breaker.failures == 0
+
+
+def test_slow_attempts_time_out_within_deadline(client, fake_gemini):
+    set_mode(fake_gemini, "slow", delay=2)
+    start = time.monotonic()
+    with pytest.raises(GeminiUnavailable, match="Timeout") as unavailable:
+        generate(client, deadline=1.2)
+    elapsed = time.monotonic() - start
+    assert elapsed < 1.2 + 0.5
+    assert 1 <= server_calls(fake_gemini) <= MAX_RETRIES + 1
+    assert client.breaker.state == "closed"
+    assert client.breaker.failures == 1
+    assert unavailable.value.retry_after == 1
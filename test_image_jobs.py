@@ -0,0 +1,96 @@
+"""ImageJobQueue.wait must see a job finished by another session (snapshot isolation)."""
+import os
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine, event, text
+
+from image_jobs import ImageJobQueue
+
+
+def _snapshot_transactions(engine):
+    """Make pysqlite BEGIN on the first statement, so reads hold a WAL snapshot like InnoDB."""
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, _):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    database_uri = 'sqlite:///' + os.path.join(tmp_path, 'jobs.db')
+    flask_app = Flask(__name__)
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    db = SQLAlchemy(flask_app)
+
+    class ImageAnalysisJob(db.Model):
+        __tablename__ = 'image_analysis_jobs'
+        id = db.Column(db.String(32), primary_key=True)
+        kind = db.Column(db.String(20), nullable=False)
+        owner = db.Column(db.String(100), nullable=False)
+        status = db.Column(db.String(20), nullable=False)
+        status_code = db.Column(db.Integer)
+        result = db.Column(db.Text)
+        error = db.Column(db.Text)
+        created_at = db.Column(db.DateTime)
+        started_at = db.Column(db.DateTime)
+        finished_at = db.Column(db.DateTime)
+        expires_at = db.Column(db.DateTime)
+
+    with flask_app.app_context():
+        _snapshot_transactions(db.engine)
+        db.create_all()
+        db.session.add(ImageAnalysisJob(id='job1', kind='gemini', owner='user:1', status='running',
+                                        created_at=datetime.now()))
+        db.session.commit()
+        queue = ImageJobQueue()
+        queue.init_app(flask_app, db, ImageAnalysisJob)
+        yield queue, database_uri
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_wait_sees_job_finished_by_another_session(jobs):
+    queue, database_uri = jobs
+    worker_engine = create_engine(database_uri)
+
+    def finish_job():
+        time.sleep(1.0)
+        with worker_engine.begin() as conn:
+            conn.execute(text("UPDATE image_analysis_jobs SET status = 'done', status_code = 200 "
+                              "WHERE id = 'job1'"))
+
+    # The route reads the job before long-polling, which opens the request's snapshot
+    assert queue.get('job1', 'user:1').status == 'running'
+    worker = threading.Thread(target=finish_job)
+    worker.start()
+    start = time.monotonic()
+    job = queue.wait('job1', 'user:1', 10)
+    elapsed = time.monotonic() - start
+    worker.join()
+    worker_engine.dispose()
+
+    assert job.status == 'done'
+    assert job.status_code == 200
+    assert elapsed < 5
+
+
+def test_wait_returns_running_job_at_deadline(jobs):
+    queue, _ = jobs
+    start = time.monotonic()
+    job = queue.wait('job1', 'user:1', 1)
+    assert job.status == 'running'
+    assert 1 <= time.monotonic() - start < 3
+
+
+def test_wait_hides_other_owners_jobs(jobs):
+    queue, _ = jobs
+    assert queue.wait('job1', 'user:2', 1) is None
@@ -0,0 +1,50 @@
+"""Per-endpoint SQL query budgets (query_budget.QUERY_BUDGETS) on a seeded SQLite database."""
+import pytest
+
+import benchmark_endpoints
+from query_budget import QUERY_BUDGETS
+
+# (endpoint, method, path template, JSON body, needs login)
+BUDGETED_ROUTES = [
+    ("get_crops", "GET", "/api/crops", None, False),
+    ("get_crop_details", "GET", "/api/crops/{crop_id}", None, False),
+    ("get_crop_details_detailed", "GET", "/api/crops/{crop_id}/details", None, False),
+    ("get_weekly_guidance", "GET", "/api/crops/{crop_id}/weekly-guidance/{week}", None, False),
+    ("get_crop_suggestions", "POST", "/api/crop-suggestions", {"soil_type": "Loamy Soil", "land_size": 2.5}, False),
+    ("get_land_calculations", "POST", "/api/land-calculations",
+     {"land_size": 2.5, "soil_type": "Loamy Soil", "irrigation_type": "drip"}, False),
+    ("get_active_crops", "GET", "/api/active-crops", None, True),
+    ("get_progress_notifications", "GET", "/api/progress/notifications/{session_id}", None, True),
+    ("get_weekly_progress_summary", "GET", "/api/progress/weekly-summary/{session_id}", None, True),
+]
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    import app as app_module
+    benchmark_endpoints.build_database(app_module, scale=20)
+    return app_module, benchmark_endpoints.pick_fixtures(app_module)
+
+
+def test_every_budget_is_exercised():
+    assert {endpoint for endpoint, *_ in BUDGETED_ROUTES} == set(QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize("endpoint, method, path, body, needs_login", BUDGETED_ROUTES,
+                         ids=[route[0] for route in BUDGETED_ROUTES])
+def test_endpoint_within_query_budget(seeded, budgeted_client, endpoint, method, path, body, needs_login):
+    app_module, fixtures = seeded
+    with app_module.app.app_context():
+        app_module.cache.clear()  # a cached response would issue no queries at all
+    if needs_login:
+        with budgeted_client.session_transaction() as sess:
+            sess['user_id'] = fixtures["user_id"]
+            sess['username'] = fixtures["username"]
+    crop_id = fixtures["crop_ids"][0]
+    url = path.format(crop_id=crop_id, week=min(fixtures["weeks"].get(crop_id) or [1]),
+                      session_id=fixtures["session_ids"][0])
+
+    response = budgeted_client.open(url, method=method, json=body)
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert app_module.app.url_map.bind('localhost').match(url, method=method)[0] == endpoint
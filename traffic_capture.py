@@ -0,0 +1,134 @@
+# traffic_capture.py - Sampled, anonymized request capture to JSONL for load-test replay
+"""
+When TRAFFIC_CAPTURE_ENABLED is on, a sample of API requests is appended to
+TRAFFIC_CAPTURE_PATH, one JSON record per line:
+
+    {"ts": 1730000000.123, "method": "POST", "route": "/api/chatbot", "view_args": {},
+     "args": {...}, "body": {"message": {"__type__": "str", "__len__": 42}}, "files": [],
+     "client": "3f9a0c1b2d4e", "auth": true, "status": 200, "duration_ms": 1834.2, "bytes": 512}
+
+Free text and identifiers are never stored: request bodies are reduced to their shape
+(types, string lengths, list sizes) except for the allow-listed, non-personal fields in
+CAPTURE_VALUE_FIELDS, and the user / IP is replaced by a salted hash. Only the route
+template is kept, never the concrete path. Its variables are kept verbatim for
+CAPTURE_VALUE_FIELDS (e.g. crop_id); other ids (user, session, job) are salted hashes,
+{"__type__": "int", "__id__": "..."}. Replay the file with replay_traffic.py, which
+fills the template with synthetic ids.
+"""
+from flask import g, request, session
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+TRAFFIC_CAPTURE_ENABLED = os.environ.get('TRAFFIC_CAPTURE_ENABLED', 'false').lower() in {'1', 'true', 'yes', 'on'}
+TRAFFIC_CAPTURE_PATH = os.environ.get('TRAFFIC_CAPTURE_PATH', 'captured_traffic.jsonl')
+TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.environ.get('TRAFFIC_CAPTURE_SAMPLE_RATE', '0.1'))
+TRAFFIC_CAPTURE_PREFIX = os.environ.get('TRAFFIC_CAPTURE_PREFIX', '/api/')
+# An empty value (as copied from .env.example) must not mean unsalted hashes
+TRAFFIC_CAPTURE_SALT = os.environ.get('TRAFFIC_CAPTURE_SALT') or os.urandom(16).hex()
+
+# Fields whose values are kept verbatim: catalog parameters, never personal data
+CAPTURE_VALUE_FIELDS = {
+    'soil_type', 'land_size', 'irrigation_type', 'crop_id', 'week', 'week_number', 'category', 'soil',
+    'difficulty', 'season', 'task_type', 'completion_status', 'completed', 'role', 'stream',
+}
+# Routes whose request bodies are never inspected at all
+CAPTURE_SKIP_BODY_ENDPOINTS = {'login', 'register', 'admin_set_password', 'legacy_login', 'legacy_register'}
+
+_write_lock = threading.Lock()
+
+
+def anonymize(value) -> str:
+    return hashlib.sha256(f"{TRAFFIC_CAPTURE_SALT}:{value}".encode()).hexdigest()[:12]
+
+
+def body_shape(value, key=None, depth=0):
+    """Reduce a JSON value to its shape, keeping only allow-listed scalar values."""
+    if key in CAPTURE_VALUE_FIELDS and (value is None or isinstance(value, (bool, int, float, str))):
+        return {"__value__": value}
+    if depth > 4:
+        return {"__type__": type(value).__name__}
+    if isinstance(value, dict):
+        return {k: body_shape(v, k, depth + 1) for k, v in value.items()}
+    if isinstance(value, list):
+        return {"__type__": "list", "__len__": len(value), "__items__": [body_shape(v, key, depth + 1) for v in value[:20]]}
+    if isinstance(value, str):
+        return {"__type__": "str", "__len__": len(value)}
+    return {"__type__": type(value).__name__}
+
+
+def view_args_shape(view_args: dict) -> dict:
+    """URL variables: allow-listed catalog values verbatim, anything else as a salted hash."""
+    return {k: (v if k in CAPTURE_VALUE_FIELDS else {"__type__": type(v).__name__, "__id__": anonymize(v)})
+            for k, v in (view_args or {}).items()}
+
+
+def _file_size(storage) -> int:
+    """Upload size in bytes. Werkzeug's content_length is 0 for parts without their own header."""
+    try:
+        stream = storage.stream
+        position = stream.tell()
+        stream.seek(0, 2)
+        size = stream.tell()
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):  # closed or non-seekable stream
+        return storage.content_length or 0
+
+
+def _record_request(response):
+    started = getattr(g, '_capture_start', None)
+    if started is None or request.url_rule is None:  # unmatched paths cannot be replayed
+        return
+    args = {k: (v if k in CAPTURE_VALUE_FIELDS else {"__type__": "str", "__len__": len(v)})
+            for k, v in request.args.items()}
+    body = None
+    if request.endpoint not in CAPTURE_SKIP_BODY_ENDPOINTS and request.is_json:
+        body = body_shape(request.get_json(silent=True))
+    files = [{"field": name, "bytes": _file_size(f), "mimetype": f.mimetype}
+             for name, f in request.files.items()]
+    user_id = session.get('user_id')
+    record = {
+        "ts": round(g._capture_wall_start, 3),
+        "method": request.method,
+        "route": request.url_rule.rule,
+        "view_args": view_args_shape(request.view_args),
+        "args": args,
+        "body": body,
+        "files": files,
+        "client": anonymize(f"user:{user_id}" if user_id else f"ip:{request.remote_addr}"),
+        "auth": bool(user_id),
+        "status": response.status_code,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        "bytes": response.calculate_content_length() or 0,
+    }
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    with _write_lock:
+        with open(TRAFFIC_CAPTURE_PATH, 'a', encoding='utf-8') as fh:
+            fh.write(line)
+
+
+def init_app(app) -> None:
+    """Register capture hooks; a no-op unless TRAFFIC_CAPTURE_ENABLED is set."""
+    if not TRAFFIC_CAPTURE_ENABLED:
+        return
+    logging.info("Traffic capture enabled: %.0f%% of %s* -> %s",
+                 TRAFFIC_CAPTURE_SAMPLE_RATE * 100, TRAFFIC_CAPTURE_PREFIX, TRAFFIC_CAPTURE_PATH)
+
+    @app.before_request
+    def _capture_start():
+        if request.path.startswith(TRAFFIC_CAPTURE_PREFIX) and random.random() < TRAFFIC_CAPTURE_SAMPLE_RATE:
+            g._capture_start = time.perf_counter()
+            g._capture_wall_start = time.time()
+
+    @app.after_request
+    def _capture_finish(response):
+        try:
+            _record_request(response)
+        except Exception as e:
+            logging.debug("Traffic capture failed: %s", e)
+        return response